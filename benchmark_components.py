@@ -9,7 +9,6 @@ Tests individual component performance:
 """
 
 import time
-import json
 import argparse
 import numpy as np
 from typing import Dict, List
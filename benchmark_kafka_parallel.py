@@ -7,7 +7,6 @@ maximum achievable throughput.
 """
 
 import time
-import json
 import argparse
 import multiprocessing
 import signal
@@ -17,7 +16,9 @@ import numpy as np
 from confluent_kafka import Consumer, Producer, TopicPartition, OFFSET_BEGINNING
 from confluent_kafka.admin import AdminClient, NewTopic
 
-from models import Portfolio, Position, RiskCalculation
+from models import (
+    Portfolio, Position, RiskCalculation, PORTFOLIO_ADAPTER, RISK_CALCULATION_ADAPTER
+)
 from prospector.core.calculations import (
     calculate_correlation_matrix,
     calculate_portfolio_metrics,
@@ -91,8 +92,7 @@ class ParallelKafkaBenchmark:
             
             try:
                 # Parse portfolio
-                portfolio_data = json.loads(msg.value())
-                portfolio = Portfolio(**portfolio_data)
+                portfolio = PORTFOLIO_ADAPTER.validate_json(msg.value())
                 
                 # Calculate risk
                 calc_start = time.time()
@@ -104,7 +104,7 @@ class ParallelKafkaBenchmark:
                 producer.produce(
                     self.output_topic,
                     key=portfolio.id.encode(),
-                    value=risk_calc.model_dump_json().encode(),
+                    value=RISK_CALCULATION_ADAPTER.dump_json(risk_calc),
                     partition=partition  # Same partition mapping
                 )
                 
@@ -7,7 +7,6 @@ to compare throughput characteristics.
 """
 
 import time
-import json
 import argparse
 from typing import Dict, Tuple
 import numpy as np
@@ -16,7 +15,9 @@ from confluent_kafka import Consumer, Producer, TopicPartition, OFFSET_BEGINNING
 from confluent_kafka.admin import AdminClient, NewTopic
 import redis
 
-from models import Portfolio, Position, RiskCalculation
+from models import (
+    Portfolio, Position, RiskCalculation, PORTFOLIO_ADAPTER, RISK_CALCULATION_ADAPTER
+)
 from prospector.core.calculations import (
     calculate_correlation_matrix,
     calculate_portfolio_metrics,
@@ -91,8 +92,7 @@ class KafkaSinkBenchmark:
             
             try:
                 # Parse portfolio
-                portfolio_data = json.loads(msg.value())
-                portfolio = Portfolio(**portfolio_data)
+                portfolio = PORTFOLIO_ADAPTER.validate_json(msg.value())
                 
                 # Calculate risk (same as regular processor)
                 calc_start = time.time()
@@ -105,7 +105,7 @@ class KafkaSinkBenchmark:
                 producer.produce(
                     self.output_topic,
                     key=portfolio.id.encode(),
-                    value=risk_calc.model_dump_json().encode(),
+                    value=RISK_CALCULATION_ADAPTER.dump_json(risk_calc),
                     partition=msg.partition()  # Same partition as input
                 )
                 
@@ -179,8 +179,7 @@ class KafkaSinkBenchmark:
             
             try:
                 # Parse portfolio
-                portfolio_data = json.loads(msg.value())
-                portfolio = Portfolio(**portfolio_data)
+                portfolio = PORTFOLIO_ADAPTER.validate_json(msg.value())
                 
                 # Calculate risk
                 calc_start = time.time()
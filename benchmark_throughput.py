@@ -4,7 +4,6 @@ Enhanced Throughput Benchmark for Prospector with detailed per-second metrics.
 """
 
 import time
-import json
 import argparse
 import signal
 import statistics
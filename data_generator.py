@@ -21,7 +21,6 @@ The generator can run in two modes:
 - Batch: Generates a fixed amount of data and exits
 """
 
-import json
 import time
 import random
 import logging
@@ -33,7 +32,7 @@ import argparse
 
 from models import (
     Portfolio, Position, MarketData, 
-    RiskTolerance, AccountType, Sector
+    RiskTolerance, AccountType, Sector, PORTFOLIO_ADAPTER
 )
 
 # Set up logging
@@ -261,7 +260,7 @@ class PortfolioGenerator:
         self.producer.produce(
             'portfolio-updates-v2',
             key=portfolio.id.encode(),
-            value=portfolio.json().encode(),
+            value=PORTFOLIO_ADAPTER.dump_json(portfolio),
             callback=self.delivery_report
         )
     
@@ -278,7 +277,7 @@ class PortfolioGenerator:
         self.producer.produce(
             'market-data',
             key=market_data.symbol.encode(),
-            value=market_data.json().encode(),
+            value=market_data.model_dump_json().encode(),
             callback=self.delivery_report
         )
     
@@ -24,7 +24,7 @@ and provide automatic JSON serialization/deserialization.
 
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, TypeAdapter
 from enum import Enum
 
 
@@ -126,6 +126,11 @@ class Portfolio(BaseModel):
         return v
 
 
+# Reusable adapter for Kafka payloads; dump_json() emits bytes straight from
+# pydantic-core without the intermediate str or a Python dict
+PORTFOLIO_ADAPTER = TypeAdapter(Portfolio)
+
+
 class MarketData(BaseModel):
     """
     Real-time market data for a security.
@@ -175,6 +180,10 @@ class RiskCalculation(BaseModel):
         return datetime.fromtimestamp(self.timestamp)
 
 
+# Reusable adapter for risk-updates payloads (see PORTFOLIO_ADAPTER)
+RISK_CALCULATION_ADAPTER = TypeAdapter(RiskCalculation)
+
+
 class PortfolioUpdate(BaseModel):
     """
     API request model for submitting portfolio updates.
@@ -208,8 +217,6 @@ class RiskMetricsResponse(BaseModel):
     timestamp: float
     last_update: datetime
 
-    model_config = ConfigDict(json_encoders={datetime: lambda v: v.isoformat()})
-
 
 class PortfolioStats(BaseModel):
     """
@@ -225,8 +232,6 @@ class PortfolioStats(BaseModel):
     current_risk_number: int
     average_calculation_time_ms: Optional[float] = None
 
-    model_config = ConfigDict(json_encoders={datetime: lambda v: v.isoformat()})
-
 
 class SystemStatus(BaseModel):
     """
@@ -289,5 +294,3 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Detailed error information")
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
-
-    model_config = ConfigDict(json_encoders={datetime: lambda v: v.isoformat()})
@@ -5,6 +5,7 @@ Prospector Risk Calculator - Master Control Script
 This script provides a unified interface to manage all Prospector components.
 """
 
+import shutil
 import subprocess
 import sys
 import time
@@ -16,6 +17,9 @@ import psutil
 import docker
 import redis
 
+# Seconds to watch Docker events for health changes before polling instead
+HEALTH_EVENT_WAIT = 20
+
 
 class ProspectorController:
     def __init__(self):
@@ -50,11 +54,16 @@ class ProspectorController:
             return required_services
         
         try:
-            containers = self.docker_client.containers.list()
+            # Use the low-level API to get the raw container JSON for just the
+            # services we care about, skipping Container object hydration
+            containers = self.docker_client.api.containers(
+                filters={'name': list(required_services)}
+            )
             for container in containers:
-                name = container.name
-                if name in required_services:
-                    required_services[name] = container.status == 'running'
+                for name in container.get('Names', []):
+                    name = name.lstrip('/')
+                    if name in required_services:
+                        required_services[name] = container.get('State') == 'running'
         except Exception as e:
             print(f"Error checking Docker services: {e}")
         
@@ -74,6 +83,10 @@ class ProspectorController:
         print("🚀 Starting infrastructure services...")
         
         try:
+            # Health events are replayed from here, so none are missed while
+            # docker-compose is still running
+            since = int(time.time()) - 1
+            
             # Use docker-compose to start services
             cmd = ['docker-compose', 'up', '-d']
             result = subprocess.run(cmd, capture_output=True, text=True)
@@ -82,15 +95,24 @@ class ProspectorController:
                 print(f"❌ Failed to start infrastructure: {result.stderr}")
                 return False
             
-            # Wait for services to be healthy
             print("⏳ Waiting for services to be healthy...")
-            max_attempts = 30
-            for i in range(max_attempts):
-                services = self.check_docker_services()
-                if services.get('kafka') and services.get('redis'):
-                    print("✅ Infrastructure is ready!")
-                    return True
-                time.sleep(2)
+            deadline = time.time() + 60
+            if self.wait_for_healthy(['kafka', 'redis'], since, deadline):
+                print("✅ Infrastructure is ready!")
+                return True
+            
+            # Fall back to polling health for the time that remains, backing
+            # off exponentially
+            delay = 0.5
+            while time.time() < deadline:
+                try:
+                    if self.healthy_services(['kafka', 'redis']) == {'kafka', 'redis'}:
+                        print("✅ Infrastructure is ready!")
+                        return True
+                except Exception as e:
+                    print(f"\n⚠️  Error checking service health: {e}")
+                time.sleep(min(delay, max(deadline - time.time(), 0)))
+                delay = min(delay * 2, 4.0)
                 print(".", end="", flush=True)
             
             print("\n❌ Infrastructure failed to become healthy")
@@ -100,6 +122,62 @@ class ProspectorController:
             print(f"❌ Error starting infrastructure: {e}")
             return False
     
+    def healthy_services(self, services: List[str]) -> set:
+        """Names of the given services whose containers currently report healthy."""
+        if not self.docker_client:
+            return set()
+        
+        healthy = set()
+        for container in self.docker_client.api.containers(
+            filters={'name': services, 'health': 'healthy'}
+        ):
+            healthy.update(name.lstrip('/') for name in container.get('Names', []))
+        return healthy & set(services)
+    
+    def wait_for_healthy(self, services: List[str], since: int, deadline: float) -> bool:
+        """
+        Block on the Docker event stream until every service reports healthy.
+        
+        The stream is only watched for up to HEALTH_EVENT_WAIT seconds, so
+        callers are left time to fall back to polling. Returns False if
+        Docker is unavailable, the stream fails, or that wait runs out.
+        """
+        if not self.docker_client:
+            return False
+        
+        pending = set(services)
+        try:
+            # Containers that were already healthy emit no new event
+            pending -= self.healthy_services(services)
+            if not pending:
+                return True
+            
+            # The daemon closes the stream itself once `until` is reached
+            events = self.docker_client.events(
+                since=since,
+                until=int(min(deadline, time.time() + HEALTH_EVENT_WAIT)) + 1,
+                filters={'type': 'container', 'container': services},
+                decode=True
+            )
+            try:
+                for event in events:
+                    # Match on Action; the legacy `status` field is gone from
+                    # newer Docker API versions
+                    if event.get('Type') != 'container':
+                        continue
+                    if event.get('Action') != 'health_status: healthy':
+                        continue
+                    pending.discard(event.get('Actor', {}).get('Attributes', {}).get('name'))
+                    print(".", end="", flush=True)
+                    if not pending:
+                        break
+            finally:
+                events.close()
+        except Exception as e:
+            print(f"\n⚠️  Docker events unavailable, polling instead: {e}")
+        
+        return not pending
+    
     def stop_infrastructure(self):
         """Stop infrastructure services."""
         print("🛑 Stopping infrastructure services...")
@@ -123,17 +201,23 @@ class ProspectorController:
         if args:
             cmd.extend(args)
         
+        # An absolute executable path plus close_fds=False (and no preexec_fn,
+        # cwd or new session) lets CPython use posix_spawn instead of fork+exec.
+        # Python-created fds are non-inheritable, so nothing extra leaks.
+        cmd[0] = shutil.which(cmd[0]) or cmd[0]
+        
         print(f"🚀 Starting {name}...")
         try:
             if name == 'dashboard':
                 # Dashboard needs to run in foreground for matplotlib
-                self.processes[name] = subprocess.Popen(cmd)
+                self.processes[name] = subprocess.Popen(cmd, close_fds=False)
             else:
                 self.processes[name] = subprocess.Popen(
                     cmd,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    text=True
+                    text=True,
+                    close_fds=False
                 )
             print(f"✅ {name} started")
             return True
@@ -159,10 +243,25 @@ class ProspectorController:
         
         del self.processes[name]
     
-    def stop_all_components(self):
-        """Stop all running components."""
-        for name in list(self.processes.keys()):
-            self.stop_component(name)
+    def stop_all_components(self, timeout: float = 5.0):
+        """Stop all running components, sharing one grace period between them."""
+        running = {name: proc for name, proc in self.processes.items() if proc.poll() is None}
+        
+        # Signal everything first so the components shut down concurrently
+        for name, proc in running.items():
+            print(f"🛑 Stopping {name}...")
+            proc.terminate()
+        
+        deadline = time.monotonic() + timeout
+        for name, proc in running.items():
+            try:
+                proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            print(f"✅ {name} stopped")
+        
+        self.processes.clear()
     
     def status(self):
         """Show status of all components."""
@@ -187,9 +286,10 @@ class ProspectorController:
         
         # Redis stats
         try:
-            r = redis.Redis(host='localhost', port=6379, decode_responses=True)
+            r = redis.Redis(host='localhost', port=6379)
             info = r.info()
-            risk_keys = len(r.keys("risk:*"))
+            # Live portfolios are indexed by expiry, so no keyspace walk is needed
+            risk_keys = r.zcount("portfolios:active", time.time(), "+inf")
             print(f"\n📊 Redis Stats:")
             print(f"  Risk calculations cached: {risk_keys}")
             print(f"  Memory used: {info.get('used_memory_human', 'N/A')}")
@@ -236,14 +336,22 @@ class ProspectorController:
         if not self.start_infrastructure():
             return
         
-        # Clean Redis
+        # Clean Redis: SCAN instead of KEYS so the server never blocks, and
+        # UNLINK so values are freed in the background
         try:
-            r = redis.Redis(host='localhost', port=6379, decode_responses=True)
-            for key in r.keys("risk:*"):
-                r.delete(key)
-            for key in r.keys("stats:*"):
-                r.delete(key)
-            r.delete("global:metrics")
+            r = redis.Redis(host='localhost', port=6379)
+            pipe = r.pipeline(transaction=False)
+            for pattern in ("portfolio:*", "stats:*", "advisor:*:portfolios"):
+                for key in r.scan_iter(match=pattern, count=1000):
+                    pipe.unlink(key)
+                    if len(pipe) >= 1000:
+                        pipe.execute()
+            pipe.unlink(
+                "global:metrics", "recent:calc_times",
+                "portfolios:active", "risk:by_number", "risk:var_95",
+                "metrics:summary"
+            )
+            pipe.execute()
             print("✅ Cleaned previous data")
         except:
             pass
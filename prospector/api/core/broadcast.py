@@ -0,0 +1,201 @@
+"""Fan-out of risk updates from one Kafka consumer to every SSE client."""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from confluent_kafka import Consumer, KafkaError, TopicPartition, OFFSET_END
+
+from ...config.constants import STREAM_BATCH_SIZE, STREAM_QUEUE_SIZE, OUTPUT_TOPIC
+
+logger = logging.getLogger(__name__)
+
+# SSE framing, pre-encoded so events are assembled purely from bytes
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+# Queued to every subscriber once the broadcaster stops for good, so their
+# streams end instead of waiting forever
+STREAM_CLOSED = None
+
+# Seconds between attempts to rebuild a failed consumer, doubling up to the max
+_RETRY_DELAY = 1.0
+_MAX_RETRY_DELAY = 30.0
+
+
+class RiskUpdateBroadcaster:
+    """
+    Single Kafka consumer on the risk output topic shared by all streams.
+    
+    Each SSE client registers an ``asyncio.Queue`` under the portfolio key it
+    wants (``None`` for every update). Every consumed batch is framed once
+    and each subscriber receives one pre-joined chunk per batch. A client
+    that falls ``STREAM_QUEUE_SIZE`` chunks behind has new chunks dropped
+    rather than holding up everyone else.
+    
+    If consuming fails, the consumer is closed and rebuilt with backoff
+    while subscribers stay registered. After ``stop()`` every subscriber
+    receives ``STREAM_CLOSED``.
+    """
+    
+    def __init__(self, bootstrap_servers: str = 'localhost:9092'):
+        """
+        Initialize broadcaster.
+        
+        Args:
+            bootstrap_servers: Kafka bootstrap servers
+        """
+        self.bootstrap_servers = bootstrap_servers
+        self.consumer: Optional[Consumer] = self._create_consumer()
+        self.subscribers: Dict[Optional[bytes], Set[asyncio.Queue]] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        
+        # Blocking consumer calls run on a dedicated thread, so a long poll
+        # never holds a slot in the loop's default executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="risk-stream")
+    
+    def _create_consumer(self) -> Consumer:
+        """Build a consumer for the output topic."""
+        # Every stream sees every update, so partitions are assigned directly
+        # rather than via a consumer group; offsets are never committed and
+        # the group id is only nominal
+        return Consumer({
+            'bootstrap.servers': self.bootstrap_servers,
+            'group.id': 'risk-api-stream',
+            'enable.auto.commit': False
+        })
+    
+    def subscribe(self, key: Optional[bytes]) -> asyncio.Queue:
+        """Register a queue for updates to ``key``, or all updates if None."""
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        if self._task is not None and self._task.done():
+            # Already stopped: end the stream straight away
+            queue.put_nowait(STREAM_CLOSED)
+            return queue
+        self.subscribers.setdefault(key, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, key: Optional[bytes], queue: asyncio.Queue) -> None:
+        """Remove a queue registered with ``subscribe``."""
+        queues = self.subscribers.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[key]
+    
+    def start(self) -> None:
+        """Start consuming on the running event loop."""
+        # Created here so it belongs to the running loop on every Python version
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._consume_loop())
+    
+    async def stop(self) -> None:
+        """Stop after the in-flight poll returns, then close the consumer."""
+        if self._stopping:
+            self._stopping.set()
+        if self._task:
+            await self._task
+    
+    def _assign_latest(self) -> None:
+        """Attach to the tail of every output partition."""
+        metadata = self.consumer.list_topics(OUTPUT_TOPIC, timeout=5.0)
+        partitions = metadata.topics[OUTPUT_TOPIC].partitions
+        self.consumer.assign([TopicPartition(OUTPUT_TOPIC, p, OFFSET_END) for p in partitions])
+    
+    async def _run_blocking(self, func, *args):
+        """Run a blocking consumer call on the broadcaster's own thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def _close_consumer(self) -> None:
+        """Close the current consumer, if any, ignoring errors from a broken one."""
+        if self.consumer is None:
+            return
+        try:
+            self.consumer.close()
+        except Exception as e:
+            logger.warning(f"Error closing risk update consumer: {e}")
+        self.consumer = None
+    
+    async def _consume_loop(self) -> None:
+        """Fetch batches on the consumer thread and fan them out on the loop."""
+        delay = _RETRY_DELAY
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if self.consumer is None:
+                        self.consumer = self._create_consumer()
+                    
+                    # The output topic may not exist until the pipeline first runs
+                    await self._run_blocking(self._assign_latest)
+                    delay = _RETRY_DELAY
+                    
+                    while not self._stopping.is_set():
+                        msgs = await self._run_blocking(
+                            self.consumer.consume, STREAM_BATCH_SIZE, 1.0
+                        )
+                        if self.subscribers:
+                            self._publish(msgs)
+                except Exception as e:
+                    # Subscribers stay registered; rebuild the consumer, which
+                    # reattaches at the tail of each partition
+                    logger.warning(f"Risk update stream failed, retrying in {delay:.0f}s: {e}")
+                    await self._run_blocking(self._close_consumer)
+                    # Back off, but wake at once if stop() is called
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    delay = min(delay * 2, _MAX_RETRY_DELAY)
+        finally:
+            self._close_consumer()
+            self._executor.shutdown(wait=False)
+            self._close_subscribers()
+    
+    def _close_subscribers(self) -> None:
+        """Queue ``STREAM_CLOSED`` for every subscriber, making room if needed."""
+        for queues in self.subscribers.values():
+            for queue in queues:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(STREAM_CLOSED)
+    
+    def _publish(self, msgs: list) -> None:
+        """Frame each message once and queue one chunk per subscriber."""
+        framed: List[bytes] = []
+        by_key: Dict[bytes, List[bytes]] = {}
+        for msg in msgs:
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error(f"Kafka error: {msg.error()}")
+                continue
+
+            # Tombstones carry no payload and have nothing to stream
+            value = msg.value()
+            if value is None:
+                continue
+
+            # The payload is already JSON, so forward it untouched
+            event = _SSE_PREFIX + value + _SSE_SUFFIX
+            framed.append(event)
+
+            # Output messages are keyed by portfolio_id, so per-portfolio
+            # streams are routed by key without parsing the payload
+            key = msg.key()
+            if key in self.subscribers:
+                by_key.setdefault(key, []).append(event)
+
+        if framed and None in self.subscribers:
+            self._offer(self.subscribers[None], b"".join(framed))
+        for key, events in by_key.items():
+            self._offer(self.subscribers[key], b"".join(events))
+
+    @staticmethod
+    def _offer(queues: Set[asyncio.Queue], chunk: bytes) -> None:
+        """Queue a chunk for each subscriber, dropping it for any that lag."""
+        for queue in queues:
+            try:
+                queue.put_nowait(chunk)
+            except asyncio.QueueFull:
+                logger.warning("Dropping risk updates for a slow stream client")
@@ -0,0 +1,61 @@
+"""In-process response cache for expensive aggregate endpoints."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Short-lived TTL cache with version-based invalidation.
+    
+    Entries expire after ``ttl`` seconds or as soon as ``invalidate()`` is
+    called, whichever comes first. Invalidation drops every entry and bumps a
+    version counter, so an entry stored concurrently under the old version
+    from another thread is never served either. Single entries can be dropped with ``discard()``. With ``maxsize``
+    set, the oldest entry is evicted once the cache is full.
+    """
+    
+    def __init__(self, ttl: float = 2.0, maxsize: Optional[int] = None):
+        """
+        Initialize response cache.
+        
+        Args:
+            ttl: Maximum age of a cached entry in seconds
+            maxsize: Maximum number of entries, or None for unbounded
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or stale."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, version, value = entry
+        if version != self.version or time.monotonic() > expires_at:
+            return None
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value under the current cache version."""
+        # Re-stored keys move to the back, so eviction follows storage order
+        self._entries.pop(key, None)
+        if self.maxsize is not None and len(self._entries) >= self.maxsize:
+            try:
+                self._entries.popitem(last=False)
+            except KeyError:
+                pass  # Emptied concurrently by discard()
+        self._entries[key] = (time.monotonic() + self.ttl, self.version, value)
+    
+    def discard(self, key: Hashable) -> None:
+        """Drop a single entry if present (safe to call from a notification thread)."""
+        self._entries.pop(key, None)
+    
+    def invalidate(self, *args: Any) -> None:
+        """Invalidate all entries (usable directly as a pub/sub handler)."""
+        self.version += 1
+        self._entries.clear()
@@ -2,15 +2,24 @@
 
 import time
 import redis
+import redis.asyncio
 import logging
 from typing import Optional
 from confluent_kafka import Producer
 
+from .broadcast import RiskUpdateBroadcaster
+from .cache import ResponseCache
+from ...config.constants import API_CACHE_TTL, API_RESPONSE_CACHE_SIZE, API_RISK_CACHE_SIZE
+
 logger = logging.getLogger(__name__)
 
 # Global resources
 redis_client: Optional[redis.Redis] = None
+async_redis_client: Optional[redis.asyncio.Redis] = None
 kafka_producer: Optional[Producer] = None
+risk_broadcaster: Optional[RiskUpdateBroadcaster] = None
+response_cache = ResponseCache(ttl=API_CACHE_TTL, maxsize=API_RESPONSE_CACHE_SIZE)
+risk_cache = ResponseCache(ttl=API_CACHE_TTL, maxsize=API_RISK_CACHE_SIZE)
 start_time = time.time()
 metrics = {
     'total_calculations': 0,
@@ -25,11 +34,31 @@ def get_redis() -> Optional[redis.Redis]:
     return redis_client
 
 
+def get_async_redis() -> Optional[redis.asyncio.Redis]:
+    """Get asyncio Redis client instance."""
+    return async_redis_client
+
+
 def get_kafka_producer() -> Optional[Producer]:
     """Get Kafka producer instance."""
     return kafka_producer
 
 
+def get_risk_broadcaster() -> Optional[RiskUpdateBroadcaster]:
+    """Get the shared risk update stream."""
+    return risk_broadcaster
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the aggregate response cache."""
+    return response_cache
+
+
+def get_risk_cache() -> ResponseCache:
+    """Get the per-portfolio risk response cache."""
+    return risk_cache
+
+
 def get_metrics() -> dict:
     """Get current metrics."""
     return metrics
@@ -1,28 +1,101 @@
 """Application lifecycle management."""
 
+import asyncio
 import logging
+import socket
+import time
 import redis
+import redis.asyncio
 from confluent_kafka import Producer
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from . import dependencies as deps
+from .broadcast import RiskUpdateBroadcaster
+from ...config.constants import (
+    API_CACHE_TTL, REDIS_POOL_SIZE, REDIS_POOL_WARM, REDIS_KEEPALIVE_IDLE
+)
+from ...core.indexes import RESULTS_UPDATED_CHANNEL
 
 logger = logging.getLogger(__name__)
 
 
+def _create_redis_pool(pool_class=redis.ConnectionPool):
+    """Build a shared pool; redis-py already sets TCP_NODELAY on each socket."""
+    keepalive_options = {}
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        keepalive_options[socket.TCP_KEEPIDLE] = REDIS_KEEPALIVE_IDLE
+    
+    return pool_class(
+        host='localhost',
+        port=6379,
+        max_connections=REDIS_POOL_SIZE,
+        socket_connect_timeout=1.0,
+        socket_keepalive=True,
+        socket_keepalive_options=keepalive_options,
+        health_check_interval=30
+    )
+
+
+async def _warm_pool(pool: redis.asyncio.ConnectionPool, count: int) -> None:
+    """Open connections up front so requests never pay the TCP handshake."""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await pool.get_connection())
+    finally:
+        for connection in connections:
+            await pool.release(connection)
+
+
+class _ResultInvalidator:
+    """
+    Drop cached responses made stale by a batch of newly written results.
+    
+    Handles the calculator's per-batch ``portfolios:updated`` message. Each
+    listed portfolio's risk response is discarded. Aggregates change with
+    every batch under load, so they are invalidated at most once per
+    ``interval``: the first update after a quiet period shows immediately,
+    and a busy stream still gets cache hits no older than the TTL.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last_invalidation = float("-inf")
+    
+    def __call__(self, message: dict) -> None:
+        for portfolio_id in message["data"].split():
+            deps.risk_cache.discard(portfolio_id.decode())
+        
+        now = time.monotonic()
+        if now - self._last_invalidation >= self.interval:
+            self._last_invalidation = now
+            deps.response_cache.invalidate()
+
+
+async def _poll_producer(producer: Producer, interval: float = 0.1) -> None:
+    """Serve delivery callbacks periodically instead of flushing per request."""
+    while True:
+        producer.poll(0)
+        await asyncio.sleep(interval)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Manage application lifecycle with proper resource initialization.
     
     Startup:
-    - Establishes Redis connection for caching
+    - Establishes a pre-warmed asyncio Redis connection pool for endpoints,
+      plus a synchronous client for the cache invalidation thread
     - Initializes Kafka producer for message publishing
+    - Starts the shared Kafka consumer that feeds every SSE stream
+    - Subscribes to the calculator's batch updates to invalidate cached responses
     - Sets service status metrics
     
     Shutdown:
-    - Flushes pending Kafka messages
+    - Stops the shared stream consumer
+    - Flushes pending Kafka messages (the only blocking flush)
     - Closes Redis connection gracefully
     """
     # Startup
@@ -30,31 +103,74 @@ async def lifespan(app: FastAPI):
     
     # Initialize Redis
     try:
-        deps.redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
+        # Requests wait for a free connection rather than fail when all
+        # REDIS_POOL_SIZE connections are busy
+        pool = _create_redis_pool(redis.asyncio.BlockingConnectionPool)
+        deps.async_redis_client = redis.asyncio.Redis(connection_pool=pool)
+        await deps.async_redis_client.ping()
+        await _warm_pool(pool, REDIS_POOL_WARM)
+        
+        deps.redis_client = redis.Redis(connection_pool=_create_redis_pool())
         deps.redis_client.ping()
         deps.metrics['redis_connected'] = True
         logger.info("✅ Redis connected")
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
         deps.redis_client = None
+        deps.async_redis_client = None
     
-    # Initialize Kafka Producer
+    # Invalidate cached responses when the calculator writes new results;
+    # expired results age out of the caches by TTL
+    invalidation_thread = None
+    if deps.redis_client:
+        try:
+            pubsub = deps.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{RESULTS_UPDATED_CHANNEL: _ResultInvalidator(API_CACHE_TTL)})
+            invalidation_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            logger.info("✅ Cache invalidation subscribed")
+        except Exception as e:
+            logger.warning(f"⚠️ Cache invalidation unavailable, relying on TTL: {e}")
+    
+    # Initialize Kafka Producer; requests never wait for broker acks, so
+    # let librdkafka batch and compress what they produce
+    poll_task = None
     try:
         deps.kafka_producer = Producer({
             'bootstrap.servers': 'localhost:9092',
-            'client.id': 'prospector-api-producer'
+            'client.id': 'prospector-api-producer',
+            'acks': 1,
+            'linger.ms': 5,
+            'batch.num.messages': 10000,
+            'compression.type': 'lz4'
         })
+        poll_task = asyncio.create_task(_poll_producer(deps.kafka_producer))
         deps.metrics['kafka_connected'] = True
         logger.info("✅ Kafka connected")
     except Exception as e:
         logger.error(f"❌ Kafka connection failed: {e}")
         deps.kafka_producer = None
     
+    # One consumer fans risk updates out to all SSE clients
+    try:
+        deps.risk_broadcaster = RiskUpdateBroadcaster()
+        deps.risk_broadcaster.start()
+    except Exception as e:
+        logger.error(f"❌ Risk update stream failed: {e}")
+        deps.risk_broadcaster = None
+    
     yield
     
     # Shutdown
     logger.info("👋 Shutting down Risk Calculator API...")
+    if invalidation_thread:
+        invalidation_thread.stop()
+    if deps.risk_broadcaster:
+        await deps.risk_broadcaster.stop()
+    if poll_task:
+        poll_task.cancel()
     if deps.kafka_producer:
-        deps.kafka_producer.flush()
+        deps.kafka_producer.flush(5.0)
+    if deps.async_redis_client:
+        await deps.async_redis_client.aclose()
     if deps.redis_client:
         deps.redis_client.close()
\ No newline at end of file
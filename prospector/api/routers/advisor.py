@@ -1,12 +1,13 @@
 """Advisor-specific endpoints."""
 
-import json
+import time
 import logging
 from typing import List
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Path
 from models import PortfolioStats
-from ..core.dependencies import get_redis
+from ...core.indexes import advisor_portfolios_key
+from ..core.dependencies import get_async_redis, get_response_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/advisor", tags=["Advisor"])
@@ -19,34 +20,47 @@ async def get_advisor_portfolios(
     """
     Retrieve all portfolios managed by a specific advisor.
     """
-    redis_client = get_redis()
+    redis_client = get_async_redis()
     if not redis_client:
         raise HTTPException(status_code=503, detail="Cache service unavailable")
     
+    cache = get_response_cache()
+    cached = cache.get(("advisor", advisor_id))
+    if cached is not None:
+        return cached
+    
     try:
         advisor_portfolios = []
+        advisor_key = advisor_id.encode()
+        
+        # Drop expired members and read the advisor's live portfolio IDs
+        index_key = advisor_portfolios_key(advisor_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(index_key, "-inf", time.time())
+        pipe.zrange(index_key, 0, -1)
+        _, portfolio_ids = await pipe.execute()
+        
+        # Fetch only the fields served, plus counts, in one round-trip
+        pipe = redis_client.pipeline(transaction=False)
+        for portfolio_id in portfolio_ids:
+            pipe.hmget(b"portfolio:" + portfolio_id, 'advisor_id', 'risk_number', 'timestamp')
+            pipe.hget(b"stats:" + portfolio_id, "count")
+        results = await pipe.execute()
         
-        # Scan portfolio calculations for this advisor
-        portfolio_keys = redis_client.keys("portfolio:*")
-        for key in portfolio_keys:
-            calc_data = redis_client.hgetall(key)
-            if calc_data and calc_data.get('advisor_id') == advisor_id:
-                # Get portfolio stats
-                stats_key = f"stats:{calc_data['portfolio_id']}"
-                stats_data = redis_client.get(stats_key)
-                
-                total_calcs = 1
-                if stats_data:
-                    stats = json.loads(stats_data)
-                    total_calcs = stats.get('count', 1)
-                
-                advisor_portfolios.append(PortfolioStats(
-                    portfolio_id=calc_data['portfolio_id'],
-                    last_update=datetime.fromtimestamp(float(calc_data['timestamp'])),
-                    total_calculations=total_calcs,
-                    current_risk_number=int(calc_data['risk_number'])
-                ))
+        # Skip results that expired in between or moved to another advisor
+        for portfolio_id, (owner, risk_number, timestamp), count in zip(
+            portfolio_ids, results[::2], results[1::2]
+        ):
+            if owner != advisor_key:
+                continue
+            advisor_portfolios.append(PortfolioStats(
+                portfolio_id=portfolio_id.decode(),
+                last_update=datetime.fromtimestamp(float(timestamp)),
+                total_calculations=int(count) if count else 1,
+                current_risk_number=int(risk_number)
+            ))
         
+        cache.set(("advisor", advisor_id), advisor_portfolios)
         return advisor_portfolios
         
     except Exception as e:
@@ -1,10 +1,10 @@
 """Health and monitoring endpoints."""
 
-import json
+import time
 import logging
 from fastapi import APIRouter, HTTPException
 from models import SystemStatus
-from ..core.dependencies import get_redis, get_uptime, get_metrics
+from ..core.dependencies import get_async_redis, get_uptime, get_metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Monitoring"])
@@ -30,7 +30,7 @@ async def health_check():
     """
     uptime = get_uptime()
     metrics = get_metrics()
-    redis_client = get_redis()
+    redis_client = get_async_redis()
     
     # Get metrics from Redis if available
     total_calcs = 0
@@ -39,20 +39,19 @@ async def health_check():
     
     if redis_client:
         try:
-            # Count all portfolio calculations in Redis
-            portfolio_keys = redis_client.keys("portfolio:*")
-            total_calcs = len(portfolio_keys)
-            active_portfolios = total_calcs
+            # Read the writer-maintained counter, latency ring buffer and live
+            # portfolio index in one round-trip instead of scanning the keyspace
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hget("global:metrics", "total_calculations")
+            pipe.lrange("recent:calc_times", 0, -1)
+            pipe.zcount("portfolios:active", time.time(), "+inf")
+            total, times, active = await pipe.execute()
             
-            # Calculate average time from recent calculations
-            times = []
-            for key in portfolio_keys[:100]:  # Sample last 100
-                calc_data = redis_client.hgetall(key)
-                if calc_data and 'calculation_time_ms' in calc_data:
-                    times.append(float(calc_data['calculation_time_ms']))
+            total_calcs = int(total or 0)
+            active_portfolios = active
             
             if times:
-                avg_time = sum(times) / len(times)
+                avg_time = sum(map(float, times)) / len(times)
         except Exception as e:
             logger.error(f"Error getting metrics: {e}")
     
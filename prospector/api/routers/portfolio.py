@@ -1,17 +1,99 @@
 """Portfolio management endpoints."""
 
+import time
+import asyncio
 import logging
-from typing import Dict
+from typing import Dict, List
+import orjson
+from pydantic import TypeAdapter
 from fastapi import APIRouter, HTTPException, Query
+from confluent_kafka import Producer
 from models import (
-    Portfolio, Position, PortfolioUpdate,
-    RiskTolerance, Sector, AccountType
+    Position, PortfolioUpdate,
+    RiskTolerance, Sector, AccountType, PORTFOLIO_ADAPTER
 )
 from ..core.dependencies import get_kafka_producer
+from ...config.constants import INPUT_TOPIC
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
 
+# The simulated portfolio always holds the same positions, so they are
+# validated and encoded once; requests only encode the fields that vary
+_SAMPLE_POSITIONS = [
+    Position(
+        symbol="AAPL",
+        quantity=100,
+        price=185.50,
+        market_value=18550.0,
+        weight=40.0,
+        sector=Sector.TECHNOLOGY
+    ),
+    Position(
+        symbol="MSFT",
+        quantity=50,
+        price=420.25,
+        market_value=21012.50,
+        weight=45.0,
+        sector=Sector.TECHNOLOGY
+    ),
+    Position(
+        symbol="JNJ",
+        quantity=75,
+        price=155.75,
+        market_value=11681.25,
+        weight=15.0,
+        sector=Sector.HEALTHCARE
+    )
+]
+_SAMPLE_TOTAL_VALUE = sum(p.market_value for p in _SAMPLE_POSITIONS)
+_SAMPLE_POSITIONS_JSON = (
+    b',"positions":' + TypeAdapter(List[Position]).dump_json(_SAMPLE_POSITIONS) +
+    b',"total_value":' + orjson.dumps(_SAMPLE_TOTAL_VALUE)
+)
+
+
+def _sample_portfolio_json(
+    portfolio_id: str, advisor_id: str, risk_tolerance: RiskTolerance
+) -> bytes:
+    """Encode a simulated Portfolio by filling the precomputed template."""
+    return b"".join((
+        b'{"id":', orjson.dumps(portfolio_id),
+        b',"advisor_id":', orjson.dumps(advisor_id),
+        b',"client_id":', orjson.dumps(f"client-{portfolio_id}"),
+        _SAMPLE_POSITIONS_JSON,
+        b',"timestamp":', orjson.dumps(time.time()),
+        b',"risk_tolerance":', orjson.dumps(risk_tolerance.value),
+        b',"account_type":', orjson.dumps(AccountType.INDIVIDUAL.value),
+        b'}'
+    ))
+
+
+def _on_delivery(err, msg) -> None:
+    """Log failed deliveries; produce() returns before the broker acknowledges."""
+    if err is not None:
+        logger.error(f"Portfolio update delivery failed: {err}")
+
+
+async def _publish(kafka_producer: Producer, key: bytes, value: bytes) -> None:
+    """
+    Queue a portfolio message without waiting for the broker.
+    
+    produce() only fails when librdkafka's local queue is full; give the
+    background poller one interval to drain it before reporting 503.
+    """
+    for attempt in range(2):
+        try:
+            kafka_producer.produce(INPUT_TOPIC, key=key, value=value, on_delivery=_on_delivery)
+            break
+        except BufferError:
+            if attempt:
+                raise HTTPException(status_code=503, detail="Message queue full, retry shortly")
+            await asyncio.sleep(0.1)
+    
+    # Serve any pending delivery callbacks without waiting on the broker
+    kafka_producer.poll(0)
+
 
 @router.post("/update", response_model=Dict[str, str])
 async def update_portfolio(update: PortfolioUpdate):
@@ -24,12 +106,11 @@ async def update_portfolio(update: PortfolioUpdate):
     
     try:
         # Send to Kafka
-        kafka_producer.produce(
-            'portfolio-updates-v2',
-            key=update.portfolio.id.encode(),
-            value=update.portfolio.model_dump_json().encode()
+        await _publish(
+            kafka_producer,
+            update.portfolio.id.encode(),
+            PORTFOLIO_ADAPTER.dump_json(update.portfolio)
         )
-        kafka_producer.flush()
         
         return {
             "status": "success",
@@ -37,6 +118,8 @@ async def update_portfolio(update: PortfolioUpdate):
             "portfolio_id": update.portfolio.id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending portfolio update: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -56,58 +139,21 @@ async def simulate_portfolio_update(
         raise HTTPException(status_code=503, detail="Message broker unavailable")
     
     try:
-        # Create a sample portfolio
-        positions = [
-            Position(
-                symbol="AAPL",
-                quantity=100,
-                price=185.50,
-                market_value=18550.0,
-                weight=40.0,
-                sector=Sector.TECHNOLOGY
-            ),
-            Position(
-                symbol="MSFT",
-                quantity=50,
-                price=420.25,
-                market_value=21012.50,
-                weight=45.0,
-                sector=Sector.TECHNOLOGY
-            ),
-            Position(
-                symbol="JNJ",
-                quantity=75,
-                price=155.75,
-                market_value=11681.25,
-                weight=15.0,
-                sector=Sector.HEALTHCARE
-            )
-        ]
-        
-        portfolio = Portfolio(
-            id=portfolio_id,
-            advisor_id=advisor_id,
-            client_id=f"client-{portfolio_id}",
-            positions=positions,
-            total_value=sum(p.market_value for p in positions),
-            risk_tolerance=risk_tolerance,
-            account_type=AccountType.INDIVIDUAL
-        )
-        
         # Send to Kafka
-        kafka_producer.produce(
-            'portfolio-updates-v2',
-            key=portfolio.id.encode(),
-            value=portfolio.model_dump_json().encode()
+        await _publish(
+            kafka_producer,
+            portfolio_id.encode(),
+            _sample_portfolio_json(portfolio_id, advisor_id, risk_tolerance)
         )
-        kafka_producer.flush()
         
         return {
             "status": "success",
             "message": f"Portfolio simulation sent for {portfolio_id}",
-            "portfolio_value": f"${portfolio.total_value:,.2f}"
+            "portfolio_value": f"${_SAMPLE_TOTAL_VALUE:,.2f}"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error simulating portfolio update: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,9 +1,11 @@
 """Portfolio collection endpoints."""
 
+import time
 import logging
 from typing import List
 from fastapi import APIRouter, HTTPException, Query
-from ..core.dependencies import get_redis
+from ...core.indexes import RISK_BY_NUMBER_KEY, queue_prune_expired
+from ..core.dependencies import get_async_redis, get_response_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/portfolios", tags=["Risk"])
@@ -16,21 +18,24 @@ async def get_high_risk_portfolios(
     """
     Identify portfolios exceeding specified risk threshold.
     """
-    redis_client = get_redis()
+    redis_client = get_async_redis()
     if not redis_client:
         raise HTTPException(status_code=503, detail="Cache service unavailable")
     
+    cache = get_response_cache()
+    cached = cache.get(("at-risk", risk_threshold))
+    if cached is not None:
+        return cached
+    
     try:
-        high_risk_portfolios = []
-        
-        # Scan all portfolio calculations
-        portfolio_keys = redis_client.keys("portfolio:*")
-        for key in portfolio_keys:
-            calc_data = redis_client.hgetall(key)
-            if calc_data and 'risk_number' in calc_data:
-                if int(calc_data['risk_number']) >= risk_threshold:
-                    high_risk_portfolios.append(calc_data['portfolio_id'])
+        # Prune expired entries, then range-query the risk number index
+        pipe = redis_client.pipeline(transaction=False)
+        queue_prune_expired(pipe, time.time())
+        pipe.zrangebyscore(RISK_BY_NUMBER_KEY, risk_threshold, "+inf")
+        _, portfolio_ids = await pipe.execute()
+        high_risk_portfolios = [portfolio_id.decode() for portfolio_id in portfolio_ids]
         
+        cache.set(("at-risk", risk_threshold), high_risk_portfolios)
         return high_risk_portfolios
         
     except Exception as e:
@@ -1,13 +1,12 @@
 """Real-time streaming endpoints."""
 
-import json
-import time
-import asyncio
 import logging
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from confluent_kafka import Consumer, KafkaError
+
+from ..core.broadcast import STREAM_CLOSED
+from ..core.dependencies import get_risk_broadcaster
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/stream", tags=["Streaming"])
@@ -24,40 +23,24 @@ async def stream_risk_updates(portfolio_id: Optional[str] = None):
     Returns:
         SSE stream of risk calculations as they occur
     """
+    broadcaster = get_risk_broadcaster()
+    if not broadcaster:
+        raise HTTPException(status_code=503, detail="Message broker unavailable")
+    
+    # Output messages are keyed by portfolio_id, so streams subscribe by key
+    key = portfolio_id.encode() if portfolio_id else None
+    
     async def event_generator():
-        consumer = Consumer({
-            'bootstrap.servers': 'localhost:9092',
-            'group.id': f'risk-api-stream-{time.time()}',
-            'auto.offset.reset': 'latest'
-        })
-        consumer.subscribe(['risk-updates'])
-        
+        # Updates arrive pre-framed from the shared consumer, one chunk per
+        # Kafka batch, until the broadcaster shuts down
+        queue = broadcaster.subscribe(key)
         try:
             while True:
-                msg = consumer.poll(1.0)
-                if msg is None:
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        continue
-                    else:
-                        logger.error(f"Kafka error: {msg.error()}")
-                        break
-                
-                try:
-                    data = json.loads(msg.value().decode('utf-8'))
-                    # Filter by portfolio_id if specified
-                    if portfolio_id and data.get('portfolio_id') != portfolio_id:
-                        continue
-                    
-                    yield f"data: {json.dumps(data)}\n\n"
-                    
-                except json.JSONDecodeError:
-                    logger.error("Failed to decode message")
-                    
+                chunk = await queue.get()
+                if chunk is STREAM_CLOSED:
+                    break
+                yield chunk
         finally:
-            consumer.close()
+            broadcaster.unsubscribe(key, queue)
     
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
\ No newline at end of file
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -24,11 +24,28 @@ MAX_CORRELATION = 0.95
 
 # Cache settings
 REDIS_TTL = 300  # 5 minutes
+RECENT_CALC_TIMES_SIZE = 100  # Latency samples kept for health checks
+API_CACHE_TTL = 2.0  # Seconds aggregate API responses may be served stale
+API_RISK_CACHE_SIZE = 10_000  # Per-portfolio risk responses held in process
+API_RESPONSE_CACHE_SIZE = 1_000  # Aggregate responses (advisor, at-risk, summary) held in process
+
+# Background Redis writer (risk calculator)
+REDIS_WRITE_BATCH_SIZE = 500  # Results sent per pipeline round-trip
+REDIS_WRITE_INTERVAL = 0.01  # Seconds to wait for a batch to fill
+REDIS_WRITE_QUEUE_SIZE = 10_000  # Results buffered before calculation blocks
+
+# Redis connection pool (API)
+REDIS_POOL_SIZE = 64  # Upper bound on concurrent Redis commands
+REDIS_POOL_WARM = 8  # Connections opened at startup
+REDIS_KEEPALIVE_IDLE = 30  # Seconds before TCP keepalive probes
 
 # Performance tracking
-PERFORMANCE_LOG_INTERVAL = 100  # Log stats every N messages
+PERFORMANCE_LOG_INTERVAL = 5.0  # Seconds between performance log lines
+RESULT_LOG_SAMPLE_RATE = 10_000  # Log one completed result out of every N
 
 # Kafka settings
 KAFKA_BATCH_SIZE = 1000
+STREAM_BATCH_SIZE = 256  # Messages per consume() call in the SSE stream
+STREAM_QUEUE_SIZE = 100  # Batches buffered per SSE client before dropping
 INPUT_TOPIC = "portfolio-updates-v2"
 OUTPUT_TOPIC = "risk-updates"
\ No newline at end of file
@@ -4,9 +4,18 @@ Security characteristics database for risk calculations.
 This module contains pre-configured characteristics for 50+ securities including
 volatility, expected returns, and beta values. In production, these would be
 derived from historical market data.
+
+Characteristics are also exposed as parallel NumPy arrays (VOLATILITIES,
+EXPECTED_RETURNS, BETAS) indexed via security_indices(), so hot paths can
+gather a whole portfolio's values in one vectorized step.
 """
 
-from typing import Dict
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping
+
+import numpy as np
 
 # Individual security characteristics
 # Format: symbol -> {volatility, expected_return, beta}
@@ -81,7 +90,57 @@ SECURITY_CHARACTERISTICS: Dict[str, Dict[str, float]] = {
     "AVGO": {"volatility": 0.26, "expected_return": 0.12, "beta": 1.3},
 }
 
-def get_security_characteristics(symbol: str) -> Dict[str, float]:
+# Defaults for unknown symbols, built once (read-only) so cached lookups share them
+TECH_DEFAULT = MappingProxyType({"volatility": 0.30, "expected_return": 0.12, "beta": 1.3})
+FINANCIAL_DEFAULT = MappingProxyType({"volatility": 0.22, "expected_return": 0.09, "beta": 1.1})
+HEALTHCARE_DEFAULT = MappingProxyType({"volatility": 0.20, "expected_return": 0.09, "beta": 0.8})
+ENERGY_DEFAULT = MappingProxyType({"volatility": 0.32, "expected_return": 0.08, "beta": 1.3})
+GENERIC_DEFAULT = MappingProxyType({"volatility": 0.20, "expected_return": 0.08, "beta": 1.0})
+
+# Symbol keyword groups in priority order, classified in a single regex match.
+# Each alternative is a lookahead over the whole symbol, so the first group
+# with any keyword wins (regardless of where in the symbol it appears), and
+# its empty capture group identifies the matching default.
+_DEFAULT_PATTERN = re.compile(
+    r"(?=.*(?:TECH|SOFT|CYBER|CLOUD|AI))()"
+    r"|(?=.*(?:BANK|CAPITAL|FINANCIAL|FUND))()"
+    r"|(?=.*(?:HEALTH|BIO|PHARMA|MED))()"
+    r"|(?=.*(?:ENERGY|OIL|GAS|SOLAR))()",
+    re.IGNORECASE | re.DOTALL
+)
+_PATTERN_DEFAULTS = (TECH_DEFAULT, FINANCIAL_DEFAULT, HEALTHCARE_DEFAULT, ENERGY_DEFAULT)
+
+# Struct-of-arrays view: one row per known security, then one per pattern
+# default in _DEFAULT_PATTERN group order, then the generic default. Rows
+# are read-only views, since lookups hand the same row to every caller.
+_ROWS = [MappingProxyType(row) for row in SECURITY_CHARACTERISTICS.values()]
+_ROWS += [*_PATTERN_DEFAULTS, GENERIC_DEFAULT]
+VOLATILITIES = np.array([row["volatility"] for row in _ROWS], dtype=np.float64)
+EXPECTED_RETURNS = np.array([row["expected_return"] for row in _ROWS], dtype=np.float64)
+BETAS = np.array([row["beta"] for row in _ROWS], dtype=np.float64)
+
+_KNOWN_ROWS = {symbol: i for i, symbol in enumerate(SECURITY_CHARACTERISTICS)}
+_PATTERN_ROW = len(SECURITY_CHARACTERISTICS)
+_GENERIC_ROW = _PATTERN_ROW + len(_PATTERN_DEFAULTS)
+
+
+def _security_row(symbol: str) -> int:
+    """Classify a symbol to its row in _ROWS and the SoA arrays."""
+    row = _KNOWN_ROWS.get(symbol)
+    if row is not None:
+        return row
+    
+    # Intelligent defaults based on symbol patterns
+    match = _DEFAULT_PATTERN.match(symbol)
+    if match:
+        return _PATTERN_ROW + match.lastindex - 1
+    
+    # Generic default for unknown symbols
+    return _GENERIC_ROW
+
+
+@lru_cache(maxsize=4096)
+def get_security_characteristics(symbol: str) -> Mapping[str, float]:
     """
     Retrieve characteristics for a security with intelligent defaults.
     
@@ -89,23 +148,48 @@ def get_security_characteristics(symbol: str) -> Dict[str, float]:
         symbol: Stock ticker symbol
         
     Returns:
-        Dictionary containing volatility, expected_return, and beta
+        Read-only mapping of volatility, expected_return, and beta
         
     For unknown symbols, returns sector-appropriate defaults based on
-    common patterns in symbol naming conventions.
+    common patterns in symbol naming conventions. Results are memoized and
+    shared between callers, hence read-only.
+    """
+    return _ROWS[_security_row(symbol)]
+
+
+class _SymbolIndex(dict):
+    """
+    Symbol -> row in the SoA arrays, seeded with every known security.
+    
+    Unknown symbols are classified on first lookup and remembered, up to a
+    bound, so lookups stay plain dict hits with no cache wrapper or lock.
+    """
+    
+    limit = 4096
+    
+    def __missing__(self, symbol: str) -> int:
+        index = _security_row(symbol)
+        if len(self) < self.limit:
+            self[symbol] = index
+        return index
+
+
+_SYMBOL_INDEX = _SymbolIndex(_KNOWN_ROWS)
+
+
+def security_index(symbol: str) -> int:
+    """Row of a symbol's characteristics in the SoA arrays."""
+    return _SYMBOL_INDEX[symbol]
+
+
+def security_indices(symbols: List[str]) -> np.ndarray:
+    """
+    Resolve symbols to rows of VOLATILITIES, EXPECTED_RETURNS and BETAS.
+    
+    Args:
+        symbols: Stock ticker symbols
+        
+    Returns:
+        Integer index array, one entry per symbol
     """
-    if symbol in SECURITY_CHARACTERISTICS:
-        return SECURITY_CHARACTERISTICS[symbol]
-    else:
-        # Intelligent defaults based on symbol patterns
-        if any(tech in symbol.upper() for tech in ['TECH', 'SOFT', 'CYBER', 'CLOUD', 'AI']):
-            return {"volatility": 0.30, "expected_return": 0.12, "beta": 1.3}
-        elif any(fin in symbol.upper() for fin in ['BANK', 'CAPITAL', 'FINANCIAL', 'FUND']):
-            return {"volatility": 0.22, "expected_return": 0.09, "beta": 1.1}
-        elif any(health in symbol.upper() for health in ['HEALTH', 'BIO', 'PHARMA', 'MED']):
-            return {"volatility": 0.20, "expected_return": 0.09, "beta": 0.8}
-        elif any(energy in symbol.upper() for energy in ['ENERGY', 'OIL', 'GAS', 'SOLAR']):
-            return {"volatility": 0.32, "expected_return": 0.08, "beta": 1.3}
-        else:
-            # Generic default for unknown symbols
-            return {"volatility": 0.20, "expected_return": 0.08, "beta": 1.0}
\ No newline at end of file
+    return np.fromiter(map(_SYMBOL_INDEX.__getitem__, symbols), dtype=np.intp, count=len(symbols))
@@ -2,8 +2,9 @@
 Core risk calculation functions for portfolio analysis.
 """
 
+import math
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import logging
 
 from ..config.constants import (
@@ -11,11 +12,19 @@ from ..config.constants import (
     SAME_SECTOR_CORRELATION, DIFFERENT_SECTOR_CORRELATION,
     BETA_CORRELATION_ADJUSTMENT, MIN_CORRELATION, MAX_CORRELATION
 )
-from ..config.securities import get_security_characteristics
-from models import Position
+from ..config.securities import BETAS, security_indices
+from ..utils.jit import njit, NUMBA_AVAILABLE
+from models import Position, Sector
 
 logger = logging.getLogger(__name__)
 
+# Small-integer code per sector so pairwise comparisons run on int arrays
+SECTOR_IDS = {sector: i for i, sector in enumerate(Sector)}
+
+# Base correlation between every pair of sector codes
+SECTOR_CORRELATION = np.full((len(SECTOR_IDS), len(SECTOR_IDS)), DIFFERENT_SECTOR_CORRELATION)
+np.fill_diagonal(SECTOR_CORRELATION, SAME_SECTOR_CORRELATION)
+
 
 def calculate_downside_risk(returns: np.ndarray, target_return: float = 0) -> float:
     """
@@ -31,21 +40,35 @@ def calculate_downside_risk(returns: np.ndarray, target_return: float = 0) -> fl
     This metric better captures investor risk perception as it focuses only
     on the possibility of losses, not general volatility.
     """
-    downside_returns = returns[returns < target_return]
+    # Shortfall below target, zero elsewhere; computed in place so the only
+    # temporary is a single float array, with no boolean-indexed copy
+    shortfall = np.subtract(returns, target_return, dtype=np.float64)
+    np.minimum(shortfall, 0.0, out=shortfall)
     
-    if len(downside_returns) == 0:
+    downside_count = np.count_nonzero(shortfall)
+    if downside_count == 0:
         return 0.0
     
-    downside_deviation = np.sqrt(np.mean((downside_returns - target_return) ** 2))
-    return downside_deviation
+    return math.sqrt(np.dot(shortfall, shortfall) / downside_count)
+
+
+def sector_ids(positions: List[Position]) -> np.ndarray:
+    """Integer sector code (see SECTOR_IDS) for each position."""
+    return np.fromiter(
+        (SECTOR_IDS[p.sector] for p in positions), dtype=np.intp, count=len(positions)
+    )
 
 
-def calculate_correlation_matrix(positions: List[Position]) -> np.ndarray:
+def calculate_correlation_matrix(
+    positions: List[Position],
+    betas: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Build sophisticated correlation matrix based on individual securities.
     
     Args:
         positions: List of portfolio positions
+        betas: Position betas, if the caller has already gathered them
         
     Returns:
         Correlation matrix incorporating sector and beta relationships
@@ -54,41 +77,144 @@ def calculate_correlation_matrix(positions: List[Position]) -> np.ndarray:
     1. Base sector correlation (0.7 for same sector, 0.3 for different)
     2. Beta similarity adjustment (similar betas increase correlation)
     3. Bounds checking to ensure valid correlation values
+    
+    Assembled by a compiled kernel when Numba is available.
     """
-    n = len(positions)
-    correlation = np.zeros((n, n))
+    # Gather each position's beta once, then work on whole pairwise matrices
+    if betas is None:
+        betas = BETAS[security_indices([p.symbol for p in positions])]
+    sectors = sector_ids(positions)
     
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                correlation[i, j] = 1.0
-            else:
-                symbol_i = positions[i].symbol
-                symbol_j = positions[j].symbol
-                sector_i = positions[i].sector
-                sector_j = positions[j].sector
-                
-                # Base correlation on sectors
-                if sector_i == sector_j:
-                    base_corr = SAME_SECTOR_CORRELATION
-                else:
-                    base_corr = DIFFERENT_SECTOR_CORRELATION
-                
-                # Adjust based on beta similarity
-                beta_i = get_security_characteristics(symbol_i)["beta"]
-                beta_j = get_security_characteristics(symbol_j)["beta"]
-                beta_diff = abs(beta_i - beta_j)
-                
-                # Similar betas increase correlation (max adjustment ±0.1)
-                beta_adjustment = -BETA_CORRELATION_ADJUSTMENT * min(beta_diff, 1.0)
-                
-                # Ensure correlation stays within valid bounds
-                correlation[i, j] = min(MAX_CORRELATION, 
-                                      max(MIN_CORRELATION, base_corr + beta_adjustment))
+    if NUMBA_AVAILABLE:
+        return _correlation_kernel(sectors, betas)
+    return _correlation_matrix(sectors, betas)
+
+
+def _correlation_matrix(sectors: np.ndarray, betas: np.ndarray) -> np.ndarray:
+    """NumPy implementation of calculate_correlation_matrix over sector codes."""
+    # Base correlation on sectors, gathered from the sector lookup table
+    base_corr = SECTOR_CORRELATION[sectors[:, None], sectors[None, :]]
+    
+    # Similar betas increase correlation (max adjustment ±0.1)
+    beta_diff = np.minimum(np.abs(betas[:, None] - betas[None, :]), 1.0)
+    
+    # Ensure correlation stays within valid bounds
+    correlation = np.clip(
+        base_corr - BETA_CORRELATION_ADJUSTMENT * beta_diff, MIN_CORRELATION, MAX_CORRELATION
+    )
+    np.fill_diagonal(correlation, 1.0)
     
     return correlation
 
 
+def calculate_batch_risk(
+    sectors: np.ndarray,
+    weighted_vols: np.ndarray,
+    betas: np.ndarray,
+    offsets: np.ndarray,
+    total_values: np.ndarray
+) -> Tuple[List[float], List[float], List[int]]:
+    """
+    Calculate volatility, VaR and base risk number for every portfolio in a batch.
+    
+    Args:
+        sectors: Sector code of every position in the batch
+        weighted_vols: Position weights multiplied by position volatilities
+        betas: Position betas
+        offsets: Start of each portfolio's positions, plus the total count
+        total_values: Total value of each portfolio
+        
+    Returns:
+        Tuple of (volatilities, var_95s, risk_numbers), one entry per portfolio;
+        risk numbers are before behavioral adjustment
+        
+    Correlations follow the calculate_correlation_matrix model. With Numba
+    available the whole batch runs in one compiled call that releases the
+    GIL, so Bytewax worker threads calculate their batches in parallel, and
+    correlations are computed pair by pair inside the variance sum without
+    building a matrix. The NumPy fallback does the same for one- and
+    two-position portfolios, where array dispatch would dominate.
+    """
+    if NUMBA_AVAILABLE:
+        volatilities, var_95s, risk_numbers = _batch_risk_kernel(
+            sectors, weighted_vols, betas, offsets, total_values
+        )
+        return volatilities.tolist(), var_95s.tolist(), risk_numbers.tolist()
+    
+    volatilities, var_95s, risk_numbers = [], [], []
+    for k in range(len(offsets) - 1):
+        start, end = offsets[k], offsets[k + 1]
+        if end - start == 1:
+            # A lone position's volatility is its own weighted volatility
+            volatility = float(weighted_vols[start])
+        elif end - start == 2:
+            # Closed form of the 2x2 quadratic form, skipping NumPy dispatch
+            vol_i, vol_j = weighted_vols[start:end].tolist()
+            correlation = _pair_correlation(
+                int(sectors[start]), int(sectors[start + 1]),
+                float(betas[start]), float(betas[start + 1])
+            )
+            volatility = math.sqrt(vol_i * vol_i + vol_j * vol_j + 2.0 * vol_i * vol_j * correlation)
+        else:
+            correlation = _correlation_matrix(sectors[start:end], betas[start:end])
+            volatility = calculate_portfolio_volatility(weighted_vols[start:end], correlation)
+        volatilities.append(volatility)
+        var_95s.append(calculate_value_at_risk(float(total_values[k]), volatility))
+        risk_numbers.append(downside_percentage_to_risk_number(-Z_SCORE * volatility * 100))
+    return volatilities, var_95s, risk_numbers
+
+
+@njit("f8(i8, i8, f8, f8)", cache=True, nogil=True)
+def _pair_correlation(sector_i: int, sector_j: int, beta_i: float, beta_j: float) -> float:
+    """Correlation of two distinct positions; same model as the NumPy path."""
+    if sector_i == sector_j:
+        base_corr = SAME_SECTOR_CORRELATION
+    else:
+        base_corr = DIFFERENT_SECTOR_CORRELATION
+    beta_diff = min(abs(beta_i - beta_j), 1.0)
+    return min(max(base_corr - BETA_CORRELATION_ADJUSTMENT * beta_diff, MIN_CORRELATION), MAX_CORRELATION)
+
+
+@njit("f8[:, ::1](i8[::1], f8[::1])", cache=True)
+def _correlation_kernel(sectors: np.ndarray, betas: np.ndarray) -> np.ndarray:
+    """
+    Fill the correlation matrix in one pass over the upper triangle.
+    
+    Same model as the NumPy path in calculate_correlation_matrix, without
+    its pairwise temporaries. Only used when Numba is available.
+    """
+    n = sectors.shape[0]
+    correlation = np.empty((n, n))
+    for i in range(n):
+        correlation[i, i] = 1.0
+        for j in range(i + 1, n):
+            value = _pair_correlation(sectors[i], sectors[j], betas[i], betas[j])
+            correlation[i, j] = value
+            correlation[j, i] = value
+    return correlation
+
+
+@njit("f8(i8[::1], f8[::1], f8[::1])", cache=True, nogil=True)
+def _volatility_kernel(sectors: np.ndarray, weighted_vols: np.ndarray, betas: np.ndarray) -> float:
+    """
+    Accumulate (w*v)'C(w*v) over the upper triangle and return its root.
+    
+    Only used when Numba is available.
+    """
+    n = sectors.shape[0]
+    diagonal = 0.0
+    off_diagonal = 0.0
+    for i in range(n):
+        diagonal += weighted_vols[i] * weighted_vols[i]
+        for j in range(i + 1, n):
+            off_diagonal += (
+                weighted_vols[i] * weighted_vols[j]
+                * _pair_correlation(sectors[i], sectors[j], betas[i], betas[j])
+            )
+    return np.sqrt(diagonal + 2.0 * off_diagonal)
+
+
+@njit("i8(f8)", cache=True)
 def downside_percentage_to_risk_number(downside_pct: float) -> int:
     """
     Convert downside risk percentage to intuitive risk score (20-100).
@@ -106,7 +232,8 @@ def downside_percentage_to_risk_number(downside_pct: float) -> int:
     - Beyond -30%: Capped at 100
     
     This non-linear mapping better reflects how investors perceive risk,
-    with accelerating concern as potential losses increase.
+    with accelerating concern as potential losses increase. Compiled with
+    Numba when available.
     """
     if downside_pct >= 0:
         return MIN_RISK_NUMBER
@@ -150,19 +277,37 @@ def calculate_portfolio_metrics(
     # Portfolio expected return (weighted average)
     portfolio_return = np.sum(weights * returns)
     
-    # Covariance matrix
-    cov_matrix = np.outer(volatilities, volatilities) * correlation
-    
-    # Portfolio variance and volatility
-    portfolio_variance = np.dot(weights, np.dot(cov_matrix, weights))
-    portfolio_volatility = np.sqrt(portfolio_variance)
-    
-    # Sharpe ratio
-    sharpe_ratio = (portfolio_return - RISK_FREE_RATE) / portfolio_volatility if portfolio_volatility > 0 else 0
+    portfolio_volatility = calculate_portfolio_volatility(weights * volatilities, correlation)
+    sharpe_ratio = calculate_sharpe_ratio(portfolio_return, portfolio_volatility)
     
     return portfolio_return, portfolio_volatility, sharpe_ratio
 
 
+def calculate_portfolio_volatility(weighted_vols: np.ndarray, correlation: np.ndarray) -> float:
+    """
+    Calculate portfolio volatility from weight-scaled position volatilities.
+    
+    Args:
+        weighted_vols: Position weights multiplied by position volatilities
+        correlation: Correlation matrix
+        
+    Returns:
+        Portfolio volatility (standard deviation)
+    """
+    # Portfolio variance w'(vv' * C)w, folded into (w*v)'C(w*v) so the
+    # covariance matrix is never materialized
+    portfolio_variance = weighted_vols @ correlation @ weighted_vols
+    return math.sqrt(portfolio_variance)
+
+
+def calculate_sharpe_ratio(portfolio_return: float, portfolio_volatility: float) -> float:
+    """Calculate the Sharpe ratio, or 0 for a zero-volatility portfolio."""
+    if portfolio_volatility > 0:
+        return (portfolio_return - RISK_FREE_RATE) / portfolio_volatility
+    return 0
+
+
+@njit(cache=True)
 def calculate_value_at_risk(
     total_value: float,
     portfolio_volatility: float,
@@ -178,6 +323,8 @@ def calculate_value_at_risk(
         
     Returns:
         VaR in dollars
+        
+    Compiled with Numba when available.
     """
     # Downside percentage at confidence level
     downside_percentage = -Z_SCORE * portfolio_volatility * 100
@@ -185,4 +332,31 @@ def calculate_value_at_risk(
     # VaR in dollars
     var = abs(downside_percentage / 100 * total_value)
     
-    return var
\ No newline at end of file
+    return var
+
+
+@njit(
+    "Tuple((f8[::1], f8[::1], i8[::1]))(i8[::1], f8[::1], f8[::1], i8[::1], f8[::1])",
+    cache=True, nogil=True
+)
+def _batch_risk_kernel(
+    sectors: np.ndarray,
+    weighted_vols: np.ndarray,
+    betas: np.ndarray,
+    offsets: np.ndarray,
+    total_values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compiled body of calculate_batch_risk, one portfolio segment at a time."""
+    n = offsets.shape[0] - 1
+    volatilities = np.empty(n)
+    var_95s = np.empty(n)
+    risk_numbers = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        start, end = offsets[k], offsets[k + 1]
+        volatility = _volatility_kernel(
+            sectors[start:end], weighted_vols[start:end], betas[start:end]
+        )
+        volatilities[k] = volatility
+        var_95s[k] = calculate_value_at_risk(total_values[k], volatility)
+        risk_numbers[k] = downside_percentage_to_risk_number(-Z_SCORE * volatility * 100)
+    return volatilities, var_95s, risk_numbers
@@ -0,0 +1,175 @@
+"""
+Redis secondary indexes over cached portfolio results.
+
+The risk calculator maintains these alongside each ``portfolio:{id}`` hash so
+the API can answer collection queries without enumerating the keyspace:
+
+    portfolios:active                 ZSET portfolio_id -> expiry timestamp
+    risk:by_number                    ZSET portfolio_id -> risk number
+    risk:var_95                       HASH portfolio_id -> VaR (95%)
+    advisor:{advisor_id}:portfolios   ZSET portfolio_id -> expiry timestamp
+    metrics:summary                   HASH running totals over live portfolios
+
+After each batch the writer also publishes the space-separated IDs of the
+portfolios it just cached on ``portfolios:updated``, so API processes can
+drop stale responses with one message per batch instead of one keyspace
+event per command.
+
+``metrics:summary`` holds ``count``, ``risk_sum``, ``var_sum`` and one
+``bucket_{low,moderate,high}`` counter per risk band. Scripts keep it exact:
+a portfolio's previous contribution is retracted before its new one is
+added, and again when its result expires.
+
+Entries are pruned lazily: expired members are removed by the writer on each
+metrics flush and by readers right before they query an index.
+
+The per-result script is loaded once with ``load_record_script`` and then
+queued by SHA as a plain EVALSHA, so a batch stays one round-trip. If Redis
+loses its script cache, the writer reloads it and replays the batch's
+``queue_record_results``; the script is idempotent per portfolio.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Tuple, Union
+
+import redis
+import redis.asyncio
+
+ACTIVE_PORTFOLIOS_KEY = "portfolios:active"
+RISK_BY_NUMBER_KEY = "risk:by_number"
+RISK_VAR_KEY = "risk:var_95"
+METRICS_SUMMARY_KEY = "metrics:summary"
+RESULTS_UPDATED_CHANNEL = "portfolios:updated"
+
+# Shared by both scripts: risk bands (matching the summary endpoint) and
+# removal of one portfolio's contribution from the summary and indexes
+_SUMMARY_FUNCTIONS = """
+local function bucket(risk)
+    if risk >= 70 then return 'bucket_high' end
+    if risk >= 30 then return 'bucket_moderate' end
+    return 'bucket_low'
+end
+
+local function retract(summary, by_number, var_by_id, id)
+    local risk = redis.call('ZSCORE', by_number, id)
+    if not risk then return end
+    risk = tonumber(risk)
+    local var = tonumber(redis.call('HGET', var_by_id, id) or '0')
+    redis.call('HINCRBY', summary, 'count', -1)
+    redis.call('HINCRBYFLOAT', summary, 'risk_sum', -risk)
+    redis.call('HINCRBYFLOAT', summary, 'var_sum', -var)
+    redis.call('HINCRBY', summary, bucket(risk), -1)
+    redis.call('ZREM', by_number, id)
+    redis.call('HDEL', var_by_id, id)
+end
+"""
+
+# Replace one portfolio's contribution. KEYS = summary, risk index, VaR hash;
+# ARGV = portfolio_id, risk_number, var_95.
+RECORD_RESULT_SCRIPT = _SUMMARY_FUNCTIONS + """
+retract(KEYS[1], KEYS[2], KEYS[3], ARGV[1])
+local risk = tonumber(ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'count', 1)
+redis.call('HINCRBYFLOAT', KEYS[1], 'risk_sum', risk)
+redis.call('HINCRBYFLOAT', KEYS[1], 'var_sum', ARGV[3])
+redis.call('HINCRBY', KEYS[1], bucket(risk), 1)
+redis.call('ZADD', KEYS[2], risk, ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+"""
+
+# SHA1 Redis assigns RECORD_RESULT_SCRIPT, so pipelines can queue EVALSHA
+# without asking the server
+RECORD_RESULT_SHA = hashlib.sha1(RECORD_RESULT_SCRIPT.encode()).hexdigest()
+
+# Retract every expired portfolio. KEYS = active index, summary, risk index,
+# VaR hash; ARGV = current time. An emptied summary is deleted so float
+# rounding from repeated increments never accumulates.
+PRUNE_EXPIRED_SCRIPT = _SUMMARY_FUNCTIONS + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    retract(KEYS[2], KEYS[3], KEYS[4], id)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if tonumber(redis.call('HGET', KEYS[2], 'count') or '0') <= 0 then
+    redis.call('DEL', KEYS[2])
+end
+return #expired
+"""
+
+
+def advisor_portfolios_key(advisor_id: str) -> str:
+    """Key of the per-advisor portfolio index."""
+    return f"advisor:{advisor_id}:portfolios"
+
+
+def load_record_script(client: redis.Redis) -> str:
+    """Load the per-result script into Redis's script cache; returns its SHA."""
+    return client.script_load(RECORD_RESULT_SCRIPT)
+
+
+def queue_record_results(
+    pipe: redis.client.Pipeline,
+    results: Iterable[Tuple[str, str, int, float]]
+) -> None:
+    """
+    Queue one EVALSHA of the record script per result.
+    
+    Requires the script to have been loaded with ``load_record_script``;
+    a missing script fails those commands with ``NoScriptError``.
+    
+    Args:
+        pipe: Pipeline to queue on
+        results: (portfolio_id, advisor_id, risk_number, var_95) per result
+    """
+    for portfolio_id, _, risk_number, var_95 in results:
+        pipe.evalsha(
+            RECORD_RESULT_SHA, 3,
+            METRICS_SUMMARY_KEY, RISK_BY_NUMBER_KEY, RISK_VAR_KEY,
+            portfolio_id, risk_number, var_95
+        )
+
+
+def queue_index_updates(
+    pipe: redis.client.Pipeline,
+    results: List[Tuple[str, str, int, float]],
+    expires_at: int
+) -> None:
+    """
+    Queue the index and summary writes for a batch of cached results.
+    
+    Expiry index entries are grouped so each batch costs one ZADD on the
+    active index and one ZADD + EXPIREAT per advisor, not per result. The
+    batch's portfolio IDs are then published on ``RESULTS_UPDATED_CHANNEL``.
+    
+    Args:
+        pipe: Pipeline the portfolio hash writes are queued on
+        results: (portfolio_id, advisor_id, risk_number, var_95) per result
+        expires_at: Unix time the batch's cached results expire
+    """
+    queue_record_results(pipe, results)
+    
+    active: Dict[str, int] = {}
+    by_advisor: Dict[str, Dict[str, int]] = {}
+    for portfolio_id, advisor_id, _, _ in results:
+        active[portfolio_id] = expires_at
+        by_advisor.setdefault(advisor_id, {})[portfolio_id] = expires_at
+    
+    if active:
+        pipe.zadd(ACTIVE_PORTFOLIOS_KEY, active)
+        pipe.publish(RESULTS_UPDATED_CHANNEL, " ".join(active))
+    for advisor_id, portfolios in by_advisor.items():
+        advisor_key = advisor_portfolios_key(advisor_id)
+        pipe.zadd(advisor_key, portfolios)
+        pipe.expireat(advisor_key, expires_at)
+
+
+def queue_prune_expired(
+    pipe: Union[redis.client.Pipeline, redis.asyncio.client.Pipeline],
+    now: float
+) -> None:
+    """Queue removal of expired portfolios from the global indexes and summary."""
+    pipe.eval(
+        PRUNE_EXPIRED_SCRIPT, 4,
+        ACTIVE_PORTFOLIOS_KEY, METRICS_SUMMARY_KEY, RISK_BY_NUMBER_KEY, RISK_VAR_KEY,
+        now
+    )
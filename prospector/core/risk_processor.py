@@ -2,28 +2,47 @@
 Main risk processing logic for portfolio analysis.
 """
 
+import queue
 import time
+from collections import deque
+import threading
 import numpy as np
 import logging
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import redis
 
 from models import Portfolio, RiskCalculation, RiskTolerance
 from ..config.constants import (
     CONSERVATIVE_ADJUSTMENT, AGGRESSIVE_ADJUSTMENT,
-    REDIS_TTL, PERFORMANCE_LOG_INTERVAL, Z_SCORE
+    REDIS_TTL, Z_SCORE, RECENT_CALC_TIMES_SIZE,
+    REDIS_WRITE_BATCH_SIZE, REDIS_WRITE_INTERVAL, REDIS_WRITE_QUEUE_SIZE
+)
+from ..config.securities import (
+    VOLATILITIES, EXPECTED_RETURNS, BETAS, security_indices
 )
-from ..config.securities import get_security_characteristics
 from ..utils.performance import PerformanceTracker
+from .indexes import (
+    load_record_script, queue_index_updates, queue_prune_expired, queue_record_results
+)
 from .calculations import (
-    calculate_correlation_matrix,
-    calculate_portfolio_metrics,
-    calculate_value_at_risk,
-    downside_percentage_to_risk_number
+    calculate_batch_risk,
+    calculate_sharpe_ratio,
+    sector_ids
 )
 
 logger = logging.getLogger(__name__)
 
+# Behavioral scale on the base risk number: conservative investors perceive
+# more risk, aggressive investors less, moderate investors are unadjusted
+_TOLERANCE_SCALE = {
+    RiskTolerance.CONSERVATIVE: CONSERVATIVE_ADJUSTMENT,
+    RiskTolerance.MODERATE: 1.0,
+    RiskTolerance.AGGRESSIVE: AGGRESSIVE_ADJUSTMENT,
+}
+
+# Queued by close() to stop the writer thread once earlier results are written
+_STOP = object()
+
 
 class RiskProcessor:
     """
@@ -35,6 +54,11 @@ class RiskProcessor:
     - Risk score generation
     - Results caching with pipelining
     - Performance tracking with batching
+    
+    A single instance is shared by every Bytewax worker thread (``-w N``).
+    Calculation threads only queue their results; one background writer
+    thread turns them into pipelined Redis writes, so the dataflow never
+    waits on a Redis round-trip. Call close() to flush pending writes.
     """
     
     def __init__(self, redis_client: Optional[redis.Redis] = None, worker_id: int = 0):
@@ -49,19 +73,35 @@ class RiskProcessor:
         self.worker_id = worker_id
         self.perf_tracker = PerformanceTracker()
         
-        # Batch metrics updates to reduce contention
+        self.batch_size = 1000  # Flush metrics every N calculations
+        self.batch_timeout = 1.0  # Or every N seconds
+        
+        # Pending metrics, only touched by the writer thread
         self.metrics_batch = {
             'calculations': 0,
             'processing_time': 0.0,
+            # Only the newest samples are ever sent, so the buffer stays
+            # bounded even while Redis is unreachable
+            'recent_times': deque(maxlen=RECENT_CALC_TIMES_SIZE),
             'last_flush': time.time()
         }
-        self.batch_size = 100  # Flush metrics every N calculations
-        self.batch_timeout = 5.0  # Or every N seconds
         
-        # Use pipeline for better performance
-        self.pipeline = None
-        if self.redis_client:
-            self.pipeline = self.redis_client.pipeline(transaction=False)
+        # Results waiting to be written; bounded so a stalled Redis slows
+        # calculation down instead of growing memory without limit
+        self._writes: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        if redis_client:
+            self._writes = queue.Queue(maxsize=REDIS_WRITE_QUEUE_SIZE)
+            self._writer = threading.Thread(
+                target=self._write_loop, name="redis-writer", daemon=True
+            )
+            self._writer.start()
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """Write every queued result and pending metric, then stop the writer."""
+        if self._writer and self._writer.is_alive():
+            self._writes.put(_STOP)
+            self._writer.join(timeout)
         
     def calculate_portfolio_risk(
         self, 
@@ -76,55 +116,124 @@ class RiskProcessor:
         Returns:
             Tuple of (portfolio_id, RiskCalculation) or None on error
         """
-        if portfolio_tuple is None:
-            return None
+        results = self.calculate_portfolio_risk_batch([portfolio_tuple])
+        return results[0] if results else None
+    
+    def calculate_portfolio_risk_batch(
+        self,
+        portfolio_tuples: List[Tuple[str, Portfolio]]
+    ) -> List[Tuple[str, RiskCalculation]]:
+        """
+        Calculate risk for a batch of portfolios.
+        
+        Position data for the whole batch is gathered into flat arrays, with
+        offsets marking where each portfolio's positions start, so security
+        lookups, the weighted return and beta sums and the volatility
+        calculation each run once per batch. If the batch cannot be prepared,
+        its portfolios are calculated one at a time so a single malformed
+        portfolio only drops its own result.
+        
+        Args:
+            portfolio_tuples: List of (portfolio_id, Portfolio object) tuples
             
-        key, portfolio = portfolio_tuple
-        start_time = time.time()
+        Returns:
+            List of (portfolio_id, RiskCalculation) for successful calculations
+        """
+        portfolio_tuples = [t for t in portfolio_tuples if t is not None]
+        if not portfolio_tuples:
+            return []
         
+        start_ns = time.perf_counter_ns()
         try:
-            # Extract portfolio data
-            positions = portfolio.positions
-            total_value = portfolio.total_value
+            positions = [
+                position for _, portfolio in portfolio_tuples for position in portfolio.positions
+            ]
+            offsets = np.zeros(len(portfolio_tuples) + 1, dtype=np.intp)
+            np.cumsum(
+                [len(portfolio.positions) for _, portfolio in portfolio_tuples], out=offsets[1:]
+            )
             
             # Get position weights
-            weights = np.array([position.weight / 100.0 for position in positions])
-            
-            # Get individual security characteristics
-            returns = []
-            volatilities = []
-            betas = []
+            weights = np.fromiter(
+                (position.weight for position in positions), dtype=np.float64, count=len(positions)
+            ) / 100.0
             
-            for position in positions:
-                chars = get_security_characteristics(position.symbol)
-                returns.append(chars["expected_return"])
-                volatilities.append(chars["volatility"])
-                betas.append(chars["beta"])
+            # Gather individual security characteristics in one pass
+            indices = security_indices([position.symbol for position in positions])
+            betas = BETAS[indices]
+            weighted_vols = weights * VOLATILITIES[indices]
             
-            returns = np.array(returns)
-            volatilities = np.array(volatilities)
-            betas = np.array(betas)
+            # Per-portfolio expected return and beta as segmented sums,
+            # unboxed to Python floats in one call each
+            portfolio_returns = np.add.reduceat(weights * EXPECTED_RETURNS[indices], offsets[:-1]).tolist()
+            portfolio_betas = np.add.reduceat(weights * betas, offsets[:-1]).tolist()
             
-            # Calculate portfolio beta
-            portfolio_beta = np.sum(weights * betas)
-            
-            # Build correlation matrix
-            correlation = calculate_correlation_matrix(positions)
+            # Volatility, VaR and base risk number of every portfolio in one
+            # call (GIL released with Numba)
+            total_values = np.fromiter(
+                (portfolio.total_value for _, portfolio in portfolio_tuples),
+                dtype=np.float64, count=len(portfolio_tuples)
+            )
+            portfolio_volatilities, var_95s, risk_numbers = calculate_batch_risk(
+                sector_ids(positions), weighted_vols, betas, offsets, total_values
+            )
+        except Exception as e:
+            if len(portfolio_tuples) == 1:
+                logger.error(f"Error calculating risk for {portfolio_tuples[0][0]}: {e}")
+                return []
             
-            # Calculate portfolio metrics
-            portfolio_return, portfolio_volatility, sharpe_ratio = calculate_portfolio_metrics(
-                weights, returns, volatilities, correlation
+            # One malformed portfolio must not cost the rest of the batch:
+            # recalculate each on its own so only the bad one is dropped
+            logger.warning(
+                f"Error preparing batch of {len(portfolio_tuples)} portfolios, "
+                f"calculating individually: {e}"
             )
+            return [
+                result
+                for portfolio_tuple in portfolio_tuples
+                for result in self.calculate_portfolio_risk_batch([portfolio_tuple])
+            ]
+        
+        # Each portfolio is charged an equal share of the batch preparation
+        shared_ns = (time.perf_counter_ns() - start_ns) // len(portfolio_tuples)
+        
+        # Results in a batch share one wall-clock timestamp
+        batch_timestamp = time.time()
+        
+        results = []
+        for i, (key, portfolio) in enumerate(portfolio_tuples):
+            result = self._calculate_portfolio_risk(
+                key, portfolio, portfolio_returns[i], portfolio_betas[i],
+                portfolio_volatilities[i], var_95s[i], risk_numbers[i],
+                shared_ns, batch_timestamp
+            )
+            if result is not None:
+                results.append(result)
+        
+        return results
+    
+    def _calculate_portfolio_risk(
+        self,
+        key: str,
+        portfolio: Portfolio,
+        portfolio_return: float,
+        portfolio_beta: float,
+        portfolio_volatility: float,
+        var_95: float,
+        risk_number: int,
+        shared_ns: int,
+        timestamp: float
+    ) -> Optional[Tuple[str, RiskCalculation]]:
+        """Finish one portfolio of a batch and queue its cache writes without executing them."""
+        start_ns = time.perf_counter_ns() - shared_ns
+        
+        try:
+            # Calculate portfolio metrics
+            sharpe_ratio = calculate_sharpe_ratio(portfolio_return, portfolio_volatility)
             
             # Calculate downside risk percentage
             downside_percentage = -Z_SCORE * portfolio_volatility * 100
             
-            # Calculate VaR
-            var_95 = calculate_value_at_risk(total_value, portfolio_volatility)
-            
-            # Convert to risk number
-            risk_number = downside_percentage_to_risk_number(downside_percentage)
-            
             # Apply behavioral adjustments
             risk_number = self._apply_risk_tolerance_adjustment(
                 risk_number, portfolio.risk_tolerance
@@ -133,7 +242,7 @@ class RiskProcessor:
             # Additional metrics
             downside_capture = portfolio_beta * 100  # Simplified metric
             
-            calculation_time = (time.time() - start_time) * 1000
+            calculation_time = (time.perf_counter_ns() - start_ns) / 1e6
             
             # Create risk calculation result
             risk_calc = RiskCalculation(
@@ -144,23 +253,24 @@ class RiskProcessor:
                 expected_return=portfolio_return,
                 volatility=portfolio_volatility,
                 sharpe_ratio=sharpe_ratio,
-                calculation_time_ms=calculation_time
+                calculation_time_ms=calculation_time,
+                timestamp=timestamp
             )
             
-            # Cache results
+            # Queue results for caching
             self._cache_results(key, risk_calc, downside_percentage, 
                               portfolio_beta, downside_capture)
             
-            # Track performance
+            # Track performance (logged periodically, see start_periodic_logging)
             self.perf_tracker.record_message(calculation_time)
-            self.perf_tracker.log_stats(PERFORMANCE_LOG_INTERVAL)
             
-            # Log completion
-            logger.info(
-                f"✅ Calculated risk for {portfolio.id}: "
-                f"Risk={risk_number}, Downside={downside_percentage:.1f}%, "
-                f"VaR=${var_95:,.2f}, Beta={portfolio_beta:.2f}"
-            )
+            # Per-portfolio detail is debug-only; the hot path skips formatting
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "✅ Calculated risk for %s: Risk=%d, Downside=%.1f%%, VaR=$%s, Beta=%.2f",
+                    portfolio.id, risk_number, downside_percentage,
+                    f"{var_95:,.2f}", portfolio_beta
+                )
             
             return (key, risk_calc)
             
@@ -168,30 +278,6 @@ class RiskProcessor:
             logger.error(f"Error calculating risk for {key}: {e}")
             return None
     
-    def _apply_risk_tolerance_adjustment(
-        self, 
-        risk_number: int, 
-        risk_tolerance: RiskTolerance
-    ) -> int:
-        """
-        Apply behavioral adjustments based on investor risk tolerance.
-        
-        Args:
-            risk_number: Base risk number
-            risk_tolerance: Investor's risk tolerance level
-            
-        Returns:
-            Adjusted risk number
-        """
-        if risk_tolerance == RiskTolerance.CONSERVATIVE:
-            # Conservative investors perceive more risk
-            risk_number = min(100, int(risk_number * CONSERVATIVE_ADJUSTMENT))
-        elif risk_tolerance == RiskTolerance.AGGRESSIVE:
-            # Aggressive investors perceive less risk
-            risk_number = max(20, int(risk_number * AGGRESSIVE_ADJUSTMENT))
-            
-        return risk_number
-    
     def _cache_results(
         self,
         key: str,
@@ -201,7 +287,7 @@ class RiskProcessor:
         downside_capture: float
     ) -> None:
         """
-        Cache risk calculation results in Redis.
+        Queue risk calculation results for the Redis writer thread.
         
         Args:
             key: Portfolio key
@@ -210,80 +296,202 @@ class RiskProcessor:
             portfolio_beta: Portfolio beta
             downside_capture: Downside capture ratio
         """
-        if not self.redis_client:
+        if self._writes is None:
             return
-            
+        
+        self._writes.put((key, risk_calc, downside_percentage, portfolio_beta, downside_capture))
+    
+    def _write_loop(self) -> None:
+        """Drain queued results into pipelined Redis writes until close()."""
+        # Batches queue the summary script by SHA; if this load fails, the
+        # first batch's NoScriptError loads it instead
+        try:
+            load_record_script(self.redis_client)
+        except Exception as e:
+            logger.error(f"Redis error: {e}")
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        stopping = False
+        while not stopping:
+            results, stopping = self._next_write_batch()
+            records = [
+                (key, risk_calc.advisor_id, risk_calc.risk_number, risk_calc.var_95)
+                for key, risk_calc, *_ in results
+            ]
+            try:
+                # One expiry time per batch, so index entries can be grouped
+                expires_at = int(time.time()) + REDIS_TTL
+                for result in results:
+                    self._queue_cache_writes(pipe, expires_at, *result)
+                
+                # Secondary indexes and summary totals so readers can query
+                # without scanning the keyspace
+                queue_index_updates(pipe, records, expires_at)
+            except Exception as e:
+                logger.error(f"Redis error: {e}")
+            self._execute_pipeline(pipe, records, force_flush=stopping)
+    
+    def _next_write_batch(self) -> Tuple[list, bool]:
+        """
+        Wait for queued results and collect a batch of them.
+        
+        Blocks up to batch_timeout for the first result, then collects more
+        for up to REDIS_WRITE_INTERVAL or until REDIS_WRITE_BATCH_SIZE. An
+        empty batch still lets due metrics be flushed while input is idle.
+        
+        Returns:
+            Tuple of (results, whether close() was requested)
+        """
+        results = []
+        try:
+            result = self._writes.get(timeout=self.batch_timeout)
+            deadline = time.monotonic() + REDIS_WRITE_INTERVAL
+            while result is not _STOP:
+                results.append(result)
+                if len(results) >= REDIS_WRITE_BATCH_SIZE:
+                    break
+                result = self._writes.get(timeout=max(deadline - time.monotonic(), 0.0))
+            if result is _STOP:
+                return results, True
+        except queue.Empty:
+            pass
+        return results, False
+    
+    def _queue_cache_writes(
+        self,
+        pipe: redis.client.Pipeline,
+        expires_at: int,
+        key: str,
+        risk_calc: RiskCalculation,
+        downside_percentage: float,
+        portfolio_beta: float,
+        downside_capture: float
+    ) -> None:
+        """Queue one result's hash and stats writes on the writer's pipeline."""
+        # Numbers are passed as-is; redis-py encodes them with repr(), which
+        # matches str() for ints and floats
         risk_data = {
             "portfolio_id": risk_calc.portfolio_id,
             "advisor_id": risk_calc.advisor_id,
-            "risk_number": str(risk_calc.risk_number),
-            "var_95": str(risk_calc.var_95),
-            "expected_return": str(risk_calc.expected_return),
-            "volatility": str(risk_calc.volatility),
-            "sharpe_ratio": str(risk_calc.sharpe_ratio),
-            "downside_percentage": str(downside_percentage),
-            "portfolio_beta": str(portfolio_beta),
-            "downside_capture": str(downside_capture),
-            "calculation_time_ms": str(risk_calc.calculation_time_ms),
-            "timestamp": str(risk_calc.timestamp),
+            "risk_number": risk_calc.risk_number,
+            "var_95": risk_calc.var_95,
+            "expected_return": risk_calc.expected_return,
+            "volatility": risk_calc.volatility,
+            "sharpe_ratio": risk_calc.sharpe_ratio,
+            "downside_percentage": downside_percentage,
+            "portfolio_beta": portfolio_beta,
+            "downside_capture": downside_capture,
+            "calculation_time_ms": risk_calc.calculation_time_ms,
+            "timestamp": risk_calc.timestamp,
             "methodology": "advanced_behavioral"
         }
         
+        pipe.hset(f"portfolio:{key}", mapping=risk_data)
+        pipe.expireat(f"portfolio:{key}", expires_at)
+        
+        # Per-portfolio stats as plain hash fields, readable without JSON
+        pipe.hincrby(f"stats:{key}", "count", 1)
+        pipe.hset(f"stats:{key}", "last_update", risk_data["timestamp"])
+        pipe.expireat(f"stats:{key}", expires_at)
+        
+        # Update batch metrics
+        self.metrics_batch['calculations'] += 1
+        self.metrics_batch['processing_time'] += risk_calc.calculation_time_ms
+        self.metrics_batch['recent_times'].append(risk_calc.calculation_time_ms)
+    
+    def _execute_pipeline(
+        self,
+        pipe: redis.client.Pipeline,
+        records: List[Tuple[str, str, int, float]],
+        force_flush: bool = False
+    ) -> None:
+        """
+        Send all queued cache writes, plus batched metrics when due, in one round-trip.
+        
+        Args:
+            pipe: Writer pipeline holding the batch's queued commands
+            records: The batch's index records, replayed if Redis lost the
+                record script
+            force_flush: Flush pending metrics regardless of batch size or age
+        """
         try:
-            # Use pipeline for all operations
-            self.pipeline.hset(f"portfolio:{key}", mapping=risk_data)
-            self.pipeline.expire(f"portfolio:{key}", REDIS_TTL)
-            
-            # Update batch metrics
-            self.metrics_batch['calculations'] += 1
-            self.metrics_batch['processing_time'] += risk_calc.calculation_time_ms
-            
             # Check if we should flush
-            should_flush = (
+            should_flush = self.metrics_batch['calculations'] > 0 and (
+                force_flush or
                 self.metrics_batch['calculations'] >= self.batch_size or
                 time.time() - self.metrics_batch['last_flush'] > self.batch_timeout
             )
             
             if should_flush:
                 # Add batched metrics to pipeline
-                self.pipeline.hincrby(
+                pipe.hincrby(
                     "global:metrics", 
                     "total_calculations", 
                     self.metrics_batch['calculations']
                 )
-                self.pipeline.hincrbyfloat(
+                pipe.hincrbyfloat(
                     "global:metrics", 
                     "total_processing_time_ms", 
                     self.metrics_batch['processing_time']
                 )
                 
                 # Worker-specific metrics (no contention)
-                self.pipeline.hincrby(
+                pipe.hincrby(
                     f"worker:{self.worker_id}:metrics",
                     "calculations",
                     self.metrics_batch['calculations']
                 )
                 
-                # Execute pipeline
-                self.pipeline.execute()
+                # Push the batch's latencies into the capped ring buffer
+                self._queue_recent_times(pipe)
+                
+                # Drop expired portfolios from the secondary indexes
+                queue_prune_expired(pipe, time.time())
+            
+            if not len(pipe):
+                return
                 
+            # One round-trip for everything queued above; execute() leaves
+            # the pipeline empty and ready for reuse. The pipeline is not a
+            # transaction, so commands after a failed one still ran and
+            # errors are inspected per command
+            responses = pipe.execute(raise_on_error=False)
+            
+            if should_flush:
                 # Reset batch
                 self.metrics_batch['calculations'] = 0
                 self.metrics_batch['processing_time'] = 0.0
+                self.metrics_batch['recent_times'].clear()
                 self.metrics_batch['last_flush'] = time.time()
-                
-                # Create new pipeline
-                self.pipeline = self.redis_client.pipeline(transaction=False)
-            else:
-                # Just execute current pipeline for portfolio data
-                self.pipeline.execute()
-                self.pipeline = self.redis_client.pipeline(transaction=False)
+            
+            errors = [r for r in responses if isinstance(r, redis.exceptions.RedisError)]
+            if any(isinstance(e, redis.exceptions.NoScriptError) for e in errors):
+                self._replay_records(records)
+            elif errors:
+                logger.error(f"Redis error: {errors[0]}")
                 
         except Exception as e:
             logger.error(f"Redis error: {e}")
-            # Reset pipeline on error
-            if self.redis_client:
-                self.pipeline = self.redis_client.pipeline(transaction=False)
+            # Drop any commands left queued by the failure
+            pipe.reset()
+    
+    def _replay_records(self, records: List[Tuple[str, str, int, float]]) -> None:
+        """Reload the record script after Redis lost it and rerun a batch's summary updates."""
+        logger.warning("Redis lost the record script, reloading it")
+        try:
+            load_record_script(self.redis_client)
+            pipe = self.redis_client.pipeline(transaction=False)
+            queue_record_results(pipe, records)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error: {e}")
+    
+    def _queue_recent_times(self, pipe: redis.client.Pipeline) -> None:
+        """Queue one LPUSH + LTRIM for all latencies recorded since the last flush."""
+        recent_times = self.metrics_batch['recent_times']
+        if recent_times:
+            pipe.lpush("recent:calc_times", *recent_times)
+            pipe.ltrim("recent:calc_times", 0, RECENT_CALC_TIMES_SIZE - 1)
     
     def _apply_risk_tolerance_adjustment(
         self, base_risk: int, tolerance: RiskTolerance
@@ -298,37 +506,7 @@ class RiskProcessor:
         Returns:
             Adjusted risk number within valid range
         """
-        if tolerance == RiskTolerance.CONSERVATIVE:
-            # Conservative investors perceive more risk
-            adjusted = int(base_risk * CONSERVATIVE_ADJUSTMENT)
-        elif tolerance == RiskTolerance.AGGRESSIVE:
-            # Aggressive investors perceive less risk
-            adjusted = int(base_risk * AGGRESSIVE_ADJUSTMENT)
-        else:
-            # Moderate - no adjustment
-            adjusted = base_risk
-            
+        adjusted = int(base_risk * _TOLERANCE_SCALE[tolerance])
+        
         # Ensure within valid range
         return max(20, min(100, adjusted))
-    
-    def flush_metrics(self):
-        """Force flush any pending metrics updates."""
-        if self.redis_client and self.pipeline and self.metrics_batch['calculations'] > 0:
-            try:
-                self.pipeline.hincrby(
-                    "global:metrics", 
-                    "total_calculations", 
-                    self.metrics_batch['calculations']
-                )
-                self.pipeline.hincrbyfloat(
-                    "global:metrics", 
-                    "total_processing_time_ms", 
-                    self.metrics_batch['processing_time']
-                )
-                self.pipeline.execute()
-                
-                self.metrics_batch['calculations'] = 0
-                self.metrics_batch['processing_time'] = 0.0
-                self.pipeline = self.redis_client.pipeline(transaction=False)
-            except Exception as e:
-                logger.error(f"Metrics flush error: {e}")
\ No newline at end of file
@@ -2,7 +2,7 @@
 Bytewax streaming pipeline for real-time risk calculation.
 """
 
-import json
+import itertools
 import logging
 from typing import Optional, Tuple
 
@@ -11,11 +11,28 @@ from bytewax.connectors.kafka import KafkaSource, KafkaSink, KafkaSinkMessage
 from bytewax.dataflow import Dataflow
 from bytewax.connectors.kafka import KafkaSourceMessage
 
-from models import Portfolio, RiskCalculation
-from ..config.constants import KAFKA_BATCH_SIZE, INPUT_TOPIC, OUTPUT_TOPIC
+from models import Portfolio, RiskCalculation, PORTFOLIO_ADAPTER, RISK_CALCULATION_ADAPTER
+from ..config.constants import KAFKA_BATCH_SIZE, INPUT_TOPIC, OUTPUT_TOPIC, RESULT_LOG_SAMPLE_RATE
 
 logger = logging.getLogger(__name__)
 
+# librdkafka consumer settings: let the broker fill larger fetches so each
+# poll returns full batches instead of paying a fetch round-trip per few messages
+CONSUMER_CONFIG = {
+    "fetch.min.bytes": "131072",
+    "fetch.wait.max.ms": "50",
+    "max.partition.fetch.bytes": "10485760",
+    "socket.receive.buffer.bytes": "2097152"
+}
+
+# librdkafka producer settings: larger compressed batches, leader-only acks
+PRODUCER_CONFIG = {
+    "linger.ms": "20",
+    "batch.size": "1048576",
+    "compression.type": "lz4",
+    "acks": "1"
+}
+
 
 def parse_kafka_message(msg: KafkaSourceMessage) -> Optional[Tuple[str, Portfolio]]:
     """
@@ -28,8 +45,8 @@ def parse_kafka_message(msg: KafkaSourceMessage) -> Optional[Tuple[str, Portfoli
         Tuple of (portfolio_id, Portfolio) or None if parsing fails
     """
     try:
-        data = json.loads(msg.value)
-        portfolio = Portfolio(**data)
+        # Parse and validate in one pass, without an intermediate dict
+        portfolio = PORTFOLIO_ADAPTER.validate_json(msg.value)
         return (portfolio.id, portfolio)
     except Exception as e:
         logger.error(f"Error parsing message: {e}")
@@ -52,10 +69,23 @@ def serialize_for_kafka(risk_data: Tuple[str, RiskCalculation]) -> Optional[Kafk
     key, risk_calc = risk_data
     return KafkaSinkMessage(
         key=risk_calc.portfolio_id.encode(),
-        value=risk_calc.json().encode()
+        value=RISK_CALCULATION_ADAPTER.dump_json(risk_calc)
     )
 
 
+# Results seen by log_sampled_result, shared by all worker threads
+_results_seen = itertools.count()
+
+
+def log_sampled_result(step_id: str, risk_data: Tuple[str, RiskCalculation]) -> None:
+    """Log one completed calculation out of every RESULT_LOG_SAMPLE_RATE."""
+    if next(_results_seen) % RESULT_LOG_SAMPLE_RATE == 0:
+        key, risk_calc = risk_data
+        logger.info(
+            "📊 Risk calculation complete for %s in %.1fms", key, risk_calc.calculation_time_ms
+        )
+
+
 def build_dataflow(risk_processor) -> Dataflow:
     """
     Construct the Bytewax dataflow pipeline for risk calculation.
@@ -68,13 +98,14 @@ def build_dataflow(risk_processor) -> Dataflow:
         
     Pipeline stages:
     1. Input: Consume portfolio updates from Kafka
-    2. Parse: Deserialize JSON to Portfolio models
-    3. Filter: Remove malformed messages
-    4. Calculate: Compute advanced risk metrics
-    5. Filter: Remove failed calculations
-    6. Log: Record processing statistics
-    7. Serialize: Prepare results for output
-    8. Output: Publish risk updates to Kafka
+    2. Calculate: Parse each batch into Portfolio models and compute advanced
+       risk metrics, dropping malformed messages and failed calculations
+    3. Log: Record a sample of completed calculations
+    4. Serialize: Prepare results for output
+    5. Output: Publish risk updates to Kafka
+    
+    Per-message work runs inside batch steps, so Bytewax dispatches once per
+    input batch rather than once per message per stage.
     """
     flow = Dataflow("prospector-risk-calculator")
     
@@ -85,48 +116,39 @@ def build_dataflow(risk_processor) -> Dataflow:
         KafkaSource(
             brokers=["localhost:9092"],
             topics=[INPUT_TOPIC],
+            add_config=CONSUMER_CONFIG,
             batch_size=KAFKA_BATCH_SIZE
         )
     )
     
-    # Parse messages into Portfolio models
-    parsed = op.map("parse", portfolio_stream, parse_kafka_message)
-    
-    # Filter out parsing failures
-    filtered = op.filter("filter-none", parsed, lambda x: x is not None)
-    
-    # Calculate risk using the processor
-    risk_calculations = op.map(
+    # Parse and calculate risk per input batch; the processor drops both
+    # unparseable messages (None) and failed calculations
+    valid_risks = op.flat_map_batch(
         "calculate-risk", 
-        filtered, 
-        risk_processor.calculate_portfolio_risk
-    )
-    
-    # Filter out calculation failures
-    valid_risks = op.filter("filter-valid", risk_calculations, lambda x: x is not None)
-    
-    # Log statistics
-    op.inspect(
-        "log-stats", 
-        valid_risks, 
-        lambda step_id, x: logger.info(
-            f"📊 Risk calculation complete for {x[0]} in {x[1].calculation_time_ms:.1f}ms"
+        portfolio_stream, 
+        lambda msgs: risk_processor.calculate_portfolio_risk_batch(
+            [parse_kafka_message(msg) for msg in msgs]
         )
     )
     
-    # Serialize for output
-    output_messages = op.map("serialize", valid_risks, serialize_for_kafka)
+    # Log a sample of results; totals come from the periodic performance log
+    op.inspect("log-stats", valid_risks, log_sampled_result)
     
-    # Filter out serialization failures
-    valid_messages = op.filter("filter-messages", output_messages, lambda x: x is not None)
+    # Serialize for output; every result here is valid, so nothing is filtered
+    output_messages = op.flat_map_batch(
+        "serialize",
+        valid_risks,
+        lambda results: [serialize_for_kafka(result) for result in results]
+    )
     
     # Output to Kafka
     op.output(
         "risk-output",
-        valid_messages,
+        output_messages,
         KafkaSink(
             brokers=["localhost:9092"],
-            topic=OUTPUT_TOPIC
+            topic=OUTPUT_TOPIC,
+            add_config=PRODUCER_CONFIG
         )
     )
     
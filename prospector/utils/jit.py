@@ -0,0 +1,28 @@
+"""
+Optional Numba JIT compilation for numeric hot paths.
+
+Numba is an optional dependency (``pip install prospector-risk-calculator[jit]``).
+When it is not installed, ``njit`` returns the decorated function unchanged so
+the pure Python/NumPy implementation is used instead.
+"""
+
+try:
+    from numba import njit as _numba_njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    _numba_njit = None
+    NUMBA_AVAILABLE = False
+
+
+def njit(*args, **kwargs):
+    """
+    Compile a function with ``numba.njit`` when available, otherwise no-op.
+
+    Supports both ``@njit`` and ``@njit(cache=True, ...)`` forms.
+    """
+    if NUMBA_AVAILABLE:
+        return _numba_njit(*args, **kwargs)
+
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+    return lambda func: func
@@ -2,15 +2,28 @@
 Performance tracking utilities for monitoring system throughput and latency.
 """
 
+import math
 import time
 import threading
-from collections import deque
-from typing import Dict
+from array import array
+from typing import Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class _Shard:
+    """Counters and latency ring buffer written by a single thread."""
+    
+    __slots__ = ('count', 'total_processing_time', 'ring', 'recent_sum')
+    
+    def __init__(self, window_size: int):
+        self.count = 0
+        self.total_processing_time = 0.0
+        self.ring = array('d', bytes(8 * window_size))
+        self.recent_sum = 0.0  # Running sum of the values in ring
+
+
 class PerformanceTracker:
     """
     Thread-safe performance metrics tracker for real-time monitoring.
@@ -20,6 +33,10 @@ class PerformanceTracker:
     - Processing time and latency
     - Throughput (messages/second)
     - Recent performance trends
+    
+    Each recording thread writes only to its own shard, so the per-message
+    path takes no lock; readers sum the shards. The recent window holds the
+    last ``window_size`` latencies of each thread.
     """
     
     def __init__(self, window_size: int = 1000):
@@ -29,12 +46,23 @@ class PerformanceTracker:
         Args:
             window_size: Size of rolling window for recent metrics
         """
-        self.messages_processed = 0
-        self.total_processing_time = 0
-        self.start_time = time.time()
-        self.recent_latencies = deque(maxlen=window_size)
-        self.lock = threading.Lock()
+        self.start_time_ns = time.monotonic_ns()
         self.window_size = window_size
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+    
+    def _shard(self) -> _Shard:
+        """This thread's shard, created and registered on first use."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(self.window_size)
+            self._shards.append(shard)
+        return shard
+    
+    @property
+    def messages_processed(self) -> int:
+        """Total messages recorded across all threads."""
+        return sum(shard.count for shard in list(self._shards))
     
     def record_message(self, latency_ms: float) -> None:
         """
@@ -43,10 +71,17 @@ class PerformanceTracker:
         Args:
             latency_ms: Processing latency in milliseconds
         """
-        with self.lock:
-            self.messages_processed += 1
-            self.total_processing_time += latency_ms
-            self.recent_latencies.append(latency_ms)
+        shard = self._shard()
+        slot = shard.count % self.window_size
+        if slot == 0 and shard.count:
+            # Resync once per lap so add/subtract rounding cannot drift
+            shard.recent_sum = math.fsum(shard.ring)
+        
+        # Slots start at zero, so subtracting the evicted value is always valid
+        shard.recent_sum += latency_ms - shard.ring[slot]
+        shard.ring[slot] = latency_ms
+        shard.total_processing_time += latency_ms
+        shard.count += 1
     
     def get_stats(self) -> Dict[str, float]:
         """
@@ -60,51 +95,73 @@ class PerformanceTracker:
             - recent_avg_latency_ms: Recent window average
             - uptime_seconds: Total runtime
         """
-        with self.lock:
-            elapsed = time.time() - self.start_time
-            
-            if elapsed <= 0:
-                return {
-                    'messages_processed': 0,
-                    'throughput_per_second': 0,
-                    'avg_latency_ms': 0,
-                    'recent_avg_latency_ms': 0,
-                    'uptime_seconds': 0
-                }
-            
-            throughput = self.messages_processed / elapsed if elapsed > 0 else 0
-            avg_latency = (self.total_processing_time / self.messages_processed 
-                          if self.messages_processed > 0 else 0)
-            recent_avg = (sum(self.recent_latencies) / len(self.recent_latencies) 
-                         if self.recent_latencies else 0)
-            
-            return {
-                'messages_processed': self.messages_processed,
-                'throughput_per_second': throughput,
-                'avg_latency_ms': avg_latency,
-                'recent_avg_latency_ms': recent_avg,
-                'uptime_seconds': elapsed
-            }
+        # Monotonic, so uptime and throughput survive wall-clock changes;
+        # clamped so a call in the same tick as start still divides safely
+        elapsed = max((time.monotonic_ns() - self.start_time_ns) / 1e9, 1e-9)
+        window_size = self.window_size
+        
+        messages_processed = 0
+        total_processing_time = 0.0
+        recent_count = 0
+        recent_total = 0.0
+        for shard in list(self._shards):
+            count = shard.count
+            filled = min(count, window_size)
+            messages_processed += count
+            total_processing_time += shard.total_processing_time
+            recent_count += filled
+            recent_total += shard.recent_sum
+        
+        throughput = messages_processed / elapsed
+        avg_latency = (total_processing_time / messages_processed 
+                      if messages_processed > 0 else 0)
+        recent_avg = recent_total / recent_count if recent_count else 0
+        
+        return {
+            'messages_processed': messages_processed,
+            'throughput_per_second': throughput,
+            'avg_latency_ms': avg_latency,
+            'recent_avg_latency_ms': recent_avg,
+            'uptime_seconds': elapsed
+        }
+    
+    def log_stats(self) -> None:
+        """Log current performance statistics."""
+        stats = self.get_stats()
+        logger.info(
+            f"📊 PERFORMANCE: Processed {stats['messages_processed']} messages | "
+            f"Throughput: {stats['throughput_per_second']:.2f} msg/s | "
+            f"Avg latency: {stats['recent_avg_latency_ms']:.2f}ms"
+        )
     
-    def log_stats(self, interval: int = 100) -> None:
+    def start_periodic_logging(self, interval: float = 5.0) -> threading.Thread:
         """
-        Log performance statistics if interval threshold is met.
+        Log statistics every ``interval`` seconds from a daemon thread.
+        
+        Keeps the logging gate off the per-message path entirely. Nothing is
+        logged while no new messages arrive.
         
         Args:
-            interval: Log every N messages
+            interval: Seconds between log lines
+            
+        Returns:
+            The started logging thread
         """
-        if self.messages_processed % interval == 0 and self.messages_processed > 0:
-            stats = self.get_stats()
-            logger.info(
-                f"📊 PERFORMANCE: Processed {stats['messages_processed']} messages | "
-                f"Throughput: {stats['throughput_per_second']:.2f} msg/s | "
-                f"Avg latency: {stats['recent_avg_latency_ms']:.2f}ms"
-            )
+        def run():
+            last_logged = 0
+            while True:
+                time.sleep(interval)
+                processed = self.messages_processed
+                if processed != last_logged:
+                    self.log_stats()
+                    last_logged = processed
+        
+        thread = threading.Thread(target=run, name="perf-stats", daemon=True)
+        thread.start()
+        return thread
     
     def reset(self) -> None:
-        """Reset all performance metrics."""
-        with self.lock:
-            self.messages_processed = 0
-            self.total_processing_time = 0
-            self.start_time = time.time()
-            self.recent_latencies.clear()
\ No newline at end of file
+        """Reset all performance metrics; threads start fresh shards on next record."""
+        self._local = threading.local()
+        self._shards = []
+        self.start_time_ns = time.monotonic_ns()
\ No newline at end of file
@@ -32,7 +32,7 @@ Key Features:
     - High-performance with sub-millisecond response times
 
 Usage:
-    Run directly: python risk_api.py
+    Run directly: python risk_api.py [--workers N]
     With uvicorn: uvicorn risk_api:app --reload
     
 API Documentation:
@@ -41,6 +41,8 @@ API Documentation:
 """
 
 import logging
+import argparse
+import importlib.util
 import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -111,11 +113,34 @@ def main():
     Configuration:
         Host: 0.0.0.0 (all interfaces)
         Port: 6066
+        Event loop: uvloop (falls back to asyncio where unavailable)
+        HTTP parser: httptools (falls back to h11 where unavailable)
+        Workers: one process by default (--workers)
+        
+    Each worker process opens its own Redis pool, its own cache invalidation
+    subscription and its own Kafka consumer for SSE streams, so broker and
+    Redis connections grow with the worker count.
         
     To run with custom settings, use uvicorn directly:
         uvicorn risk_api:app --host 127.0.0.1 --port 8000 --workers 4
     """
-    uvicorn.run(app, host="0.0.0.0", port=6066)
+    parser = argparse.ArgumentParser(description="Prospector Risk API")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes, each with its own Redis "
+                             "and Kafka connections (default: 1)")
+    args = parser.parse_args()
+    
+    # uvloop and httptools come with uvicorn[standard]; request them
+    # explicitly, falling back to the pure-Python stack where unavailable
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(f"Serving with {loop} event loop and {http} HTTP parser")
+    
+    # Worker processes re-import the app, so it is passed by import string
+    uvicorn.run(
+        "risk_api:app", host="0.0.0.0", port=6066,
+        loop=loop, http=http, workers=args.workers
+    )
 
 
 if __name__ == "__main__":
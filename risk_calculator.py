@@ -27,6 +27,7 @@ import time
 import redis
 from bytewax.run import cli_main
 
+from prospector.config.constants import PERFORMANCE_LOG_INTERVAL
 from prospector.core.risk_processor import RiskProcessor
 from prospector.streaming.pipeline import build_dataflow
 
@@ -56,7 +57,6 @@ def initialize_redis() -> redis.Redis:
         pool = redis.ConnectionPool(
             host='localhost', 
             port=6379, 
-            decode_responses=True,
             max_connections=50  # Support multiple concurrent operations
         )
         client = redis.Redis(connection_pool=pool)
@@ -103,15 +103,19 @@ def main():
     
     # Reset global metrics
     if redis_client:
-        redis_client.delete("global:metrics")
+        redis_client.delete("global:metrics", "recent:calc_times")
         redis_client.hset("global:metrics", "start_time", str(time.time()))
     
     # Create risk processor
     risk_processor = RiskProcessor(redis_client)
+    risk_processor.perf_tracker.start_periodic_logging(PERFORMANCE_LOG_INTERVAL)
     
     # Build and run dataflow
     flow = build_dataflow(risk_processor)
-    cli_main(flow)
+    try:
+        cli_main(flow)
+    finally:
+        risk_processor.close()
 
 
 if __name__ == "__main__":
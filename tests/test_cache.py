@@ -0,0 +1,110 @@
+"""Tests for the in-process API response cache."""
+
+import pytest
+
+from prospector.api.core import cache as cache_module
+from prospector.api.core.cache import ResponseCache
+
+
+class FakeClock:
+    """Stand-in for the time module with a manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def test_entry_served_until_ttl_expires(clock):
+    cache = ResponseCache(ttl=2.0)
+    cache.set("summary", {"count": 3})
+
+    clock.now += 1.9
+    assert cache.get("summary") == {"count": 3}
+
+    clock.now += 0.2
+    assert cache.get("summary") is None
+
+
+def test_missing_key_returns_none(clock):
+    assert ResponseCache().get("absent") is None
+
+
+def test_maxsize_evicts_oldest_entry(clock):
+    cache = ResponseCache(ttl=60.0, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+    assert len(cache._entries) == 2
+
+
+def test_invalidate_hides_entries_from_older_versions(clock):
+    cache = ResponseCache(ttl=60.0)
+    cache.set("a", 1)
+
+    cache.invalidate()
+    assert cache.get("a") is None
+    assert not cache._entries
+
+    # Entries stored after invalidation belong to the new version
+    cache.set("a", 2)
+    assert cache.get("a") == 2
+
+
+def test_invalidate_accepts_pubsub_message(clock):
+    cache = ResponseCache(ttl=60.0)
+    cache.set("a", 1)
+
+    cache.invalidate({"type": "message", "data": b"p1"})
+    assert cache.get("a") is None
+
+
+def test_discard_drops_only_that_entry(clock):
+    cache = ResponseCache(ttl=60.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.discard("a")
+    cache.discard("missing")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_version_guards_values_stored_across_invalidation(clock):
+    cache = ResponseCache(ttl=60.0)
+    cache._entries["a"] = (clock.now + 60.0, cache.version - 1, "stale")
+
+    assert cache.get("a") is None
+
+
+def test_restored_key_is_not_evicted_first(clock):
+    cache = ResponseCache(ttl=60.0, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)
+    cache.set("c", 4)
+
+    assert cache.get("a") == 3
+    assert cache.get("b") is None
+    assert cache.get("c") == 4
+
+
+def test_bounded_under_many_distinct_keys(clock):
+    cache = ResponseCache(ttl=60.0, maxsize=10)
+    for i in range(1000):
+        cache.set(("advisor", f"a{i}"), i)
+
+    assert len(cache._entries) == 10
@@ -0,0 +1,133 @@
+"""Tests for the Redis index and summary scripts, run against fakeredis."""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+
+import redis
+
+from prospector.core.indexes import (
+    ACTIVE_PORTFOLIOS_KEY,
+    METRICS_SUMMARY_KEY,
+    RESULTS_UPDATED_CHANNEL,
+    RISK_BY_NUMBER_KEY,
+    RECORD_RESULT_SHA,
+    RISK_VAR_KEY,
+    advisor_portfolios_key,
+    load_record_script,
+    queue_index_updates,
+    queue_prune_expired,
+)
+
+
+# Expiry times far enough ahead that Redis never expires the advisor indexes
+# mid-test; pruning compares against explicit times instead of the clock
+LATER = 4_000_000_000
+
+
+@pytest.fixture
+def client():
+    client = fakeredis.FakeRedis()
+    load_record_script(client)
+    return client
+
+
+def record(client, results, expires_at=LATER):
+    """Write one batch of (portfolio_id, advisor_id, risk_number, var_95) results."""
+    pipe = client.pipeline(transaction=False)
+    queue_index_updates(pipe, results, expires_at)
+    pipe.execute()
+
+
+def prune(client, now):
+    pipe = client.pipeline(transaction=False)
+    queue_prune_expired(pipe, now)
+    return pipe.execute()[0]
+
+
+def summary(client):
+    """metrics:summary with counts as ints and sums as floats."""
+    raw = {k.decode(): v for k, v in client.hgetall(METRICS_SUMMARY_KEY).items()}
+    return {k: float(v) if k.endswith("_sum") else int(v) for k, v in raw.items()}
+
+
+def test_record_adds_contribution_and_indexes(client):
+    record(client, [("p1", "a1", 50, 100.0), ("p2", "a1", 10, 40.0)])
+
+    assert summary(client) == {
+        "count": 2, "risk_sum": 60.0, "var_sum": 140.0,
+        "bucket_moderate": 1, "bucket_low": 1,
+    }
+    assert client.zscore(RISK_BY_NUMBER_KEY, "p1") == 50
+    assert float(client.hget(RISK_VAR_KEY, "p2")) == 40.0
+    assert client.zscore(ACTIVE_PORTFOLIOS_KEY, "p1") == LATER
+    assert set(client.zrange(advisor_portfolios_key("a1"), 0, -1)) == {b"p1", b"p2"}
+
+
+def test_rerecord_replaces_previous_contribution(client):
+    record(client, [("p1", "a1", 50, 100.0)])
+    record(client, [("p1", "a1", 80, 250.0)])
+
+    assert summary(client) == {
+        "count": 1, "risk_sum": 80.0, "var_sum": 250.0,
+        "bucket_moderate": 0, "bucket_high": 1,
+    }
+    assert client.zscore(RISK_BY_NUMBER_KEY, "p1") == 80
+
+
+def test_prune_retracts_only_expired_portfolios(client):
+    record(client, [("p1", "a1", 75, 300.0)], expires_at=LATER)
+    record(client, [("p2", "a2", 25, 50.0)], expires_at=LATER + 600)
+
+    assert prune(client, LATER + 300) == 1
+
+    assert summary(client) == {
+        "count": 1, "risk_sum": 25.0, "var_sum": 50.0,
+        "bucket_high": 0, "bucket_low": 1,
+    }
+    assert client.zscore(RISK_BY_NUMBER_KEY, "p1") is None
+    assert client.hget(RISK_VAR_KEY, "p1") is None
+    assert client.zscore(ACTIVE_PORTFOLIOS_KEY, "p1") is None
+    assert client.zscore(ACTIVE_PORTFOLIOS_KEY, "p2") == LATER + 600
+
+
+def test_prune_deletes_emptied_summary(client):
+    record(client, [("p1", "a1", 40, 10.0), ("p2", "a1", 90, 20.0)])
+
+    assert prune(client, LATER) == 2
+    assert not client.exists(METRICS_SUMMARY_KEY)
+    assert client.zcard(RISK_BY_NUMBER_KEY) == 0
+
+
+def test_rerecord_after_expiry_counts_once(client):
+    record(client, [("p1", "a1", 50, 100.0)])
+    prune(client, LATER + 300)
+    record(client, [("p1", "a1", 60, 120.0)], expires_at=LATER + 600)
+
+    assert summary(client) == {
+        "count": 1, "risk_sum": 60.0, "var_sum": 120.0, "bucket_moderate": 1,
+    }
+
+
+def test_batch_publishes_updated_ids_once(client):
+    pubsub = client.pubsub()
+    pubsub.subscribe(RESULTS_UPDATED_CHANNEL)
+    assert pubsub.get_message(timeout=1.0)["type"] == "subscribe"
+
+    record(client, [("p1", "a1", 50, 100.0), ("p2", "a2", 30, 60.0)])
+
+    message = pubsub.get_message(timeout=1.0)
+    assert set(message["data"].split()) == {b"p1", b"p2"}
+    assert pubsub.get_message(timeout=0.1) is None
+
+
+def test_precomputed_sha_matches_loaded_script(client):
+    assert load_record_script(client) == RECORD_RESULT_SHA
+
+
+def test_unloaded_script_fails_with_noscript(client):
+    client.script_flush()
+
+    with pytest.raises(redis.exceptions.NoScriptError):
+        record(client, [("p1", "a1", 50, 100.0)])
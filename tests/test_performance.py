@@ -0,0 +1,76 @@
+"""Tests for the per-thread sharded performance tracker."""
+
+import math
+import threading
+
+import pytest
+
+from prospector.utils.performance import PerformanceTracker
+
+
+def test_window_average_after_ring_wraps():
+    tracker = PerformanceTracker(window_size=4)
+    latencies = [float(i) for i in range(1, 11)]
+    for latency in latencies:
+        tracker.record_message(latency)
+
+    stats = tracker.get_stats()
+    assert stats['messages_processed'] == 10
+    assert stats['avg_latency_ms'] == pytest.approx(sum(latencies) / 10)
+    assert stats['recent_avg_latency_ms'] == pytest.approx(sum(latencies[-4:]) / 4)
+
+
+def test_running_sum_matches_ring_across_laps():
+    tracker = PerformanceTracker(window_size=8)
+    for i in range(8 * 50 + 3):
+        tracker.record_message(0.1 * (i % 7) + 1e-3)
+
+    shard = tracker._shards[0]
+    assert shard.recent_sum == pytest.approx(math.fsum(shard.ring), abs=1e-9)
+
+
+def test_partial_window_averages_recorded_messages_only():
+    tracker = PerformanceTracker(window_size=100)
+    tracker.record_message(2.0)
+    tracker.record_message(4.0)
+
+    assert tracker.get_stats()['recent_avg_latency_ms'] == pytest.approx(3.0)
+
+
+def test_stats_aggregate_shards_from_every_thread():
+    tracker = PerformanceTracker(window_size=5)
+    threads = [
+        threading.Thread(
+            target=lambda latency=float(n): [tracker.record_message(latency) for _ in range(20)]
+        )
+        for n in range(1, 5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One shard per recording thread, each window full of its own latency
+    assert len(tracker._shards) == 4
+    stats = tracker.get_stats()
+    assert stats['messages_processed'] == 80
+    assert tracker.messages_processed == 80
+    assert stats['avg_latency_ms'] == pytest.approx(2.5)
+    assert stats['recent_avg_latency_ms'] == pytest.approx(2.5)
+
+
+def test_reset_starts_fresh_shards():
+    tracker = PerformanceTracker(window_size=4)
+    tracker.record_message(5.0)
+    tracker.reset()
+
+    assert tracker.get_stats()['messages_processed'] == 0
+    tracker.record_message(1.0)
+    assert tracker.get_stats()['recent_avg_latency_ms'] == pytest.approx(1.0)
+
+
+def test_empty_tracker_reports_zeroes():
+    stats = PerformanceTracker().get_stats()
+    assert stats['messages_processed'] == 0
+    assert stats['avg_latency_ms'] == 0
+    assert stats['recent_avg_latency_ms'] == 0
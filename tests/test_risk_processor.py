@@ -0,0 +1,65 @@
+"""Tests for the risk processor's background Redis writer."""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+
+from models import Portfolio
+from prospector.core.indexes import METRICS_SUMMARY_KEY, RISK_BY_NUMBER_KEY
+from prospector.core.risk_processor import RiskProcessor
+
+
+def make_portfolio(portfolio_id: str, advisor_id: str = "a1") -> Portfolio:
+    positions = [
+        {"symbol": symbol, "quantity": 10.0, "price": 100.0, "market_value": 1000.0,
+         "weight": 50.0, "sector": sector}
+        for symbol, sector in (("AAPL", "Technology"), ("JNJ", "Healthcare"))
+    ]
+    return Portfolio(
+        id=portfolio_id, advisor_id=advisor_id, client_id="c1", positions=positions,
+        total_value=2000.0, risk_tolerance="Moderate", timestamp=1.0
+    )
+
+
+def calculate_and_close(client, portfolio_ids):
+    processor = RiskProcessor(client)
+    processor.calculate_portfolio_risk_batch(
+        [(portfolio_id, make_portfolio(portfolio_id)) for portfolio_id in portfolio_ids]
+    )
+    processor.close()
+
+
+def test_writer_records_summary_for_each_result():
+    client = fakeredis.FakeRedis()
+    calculate_and_close(client, ["p1", "p2", "p3"])
+
+    assert int(client.hget(METRICS_SUMMARY_KEY, "count")) == 3
+    assert client.zcard(RISK_BY_NUMBER_KEY) == 3
+    assert int(client.hget("global:metrics", "total_calculations")) == 3
+
+
+def test_writer_replays_batch_after_script_cache_loss(monkeypatch):
+    client = fakeredis.FakeRedis()
+
+    # Simulate Redis restarting between the writer's startup load and its
+    # first batch, so the batch's EVALSHA commands hit an empty script cache
+    from prospector.core import risk_processor
+    real_load = risk_processor.load_record_script
+    loads = []
+
+    def load_then_flush(redis_client):
+        sha = real_load(redis_client)
+        if not loads:
+            redis_client.script_flush()
+        loads.append(sha)
+        return sha
+
+    monkeypatch.setattr(risk_processor, "load_record_script", load_then_flush)
+    calculate_and_close(client, ["p1", "p2"])
+
+    assert len(loads) == 2
+    assert int(client.hget(METRICS_SUMMARY_KEY, "count")) == 2
+    assert client.zcard(RISK_BY_NUMBER_KEY) == 2
+    # Other writes in the failed round-trip still ran and are not repeated
+    assert int(client.hget("global:metrics", "total_calculations")) == 2